@@ -1,3 +1,16 @@
-from .chunker import chunk_transcript
+from .chunker import chunk_transcript, TranscriptChunker
+from .segmenter import segment_transcript
+from .normalizer import normalize_transcript, TranscriptNormalizer
+from .pipeline import load_transcript, load_chunks, load_chapters, TranscriptNotFound
 
-__all__ = ['chunk_transcript']
\ No newline at end of file
+__all__ = [
+    'chunk_transcript',
+    'TranscriptChunker',
+    'segment_transcript',
+    'normalize_transcript',
+    'TranscriptNormalizer',
+    'load_transcript',
+    'load_chunks',
+    'load_chapters',
+    'TranscriptNotFound',
+]
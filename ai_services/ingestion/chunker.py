@@ -1,42 +1,70 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
 
-def chunk_transcript(
-    transcript: List[Dict],
-    max_words: int = 150
-) -> List[Dict]:
 
-    chunks = []
-    current_words = []
-    word_count = 0
-    start_time = None
+class TranscriptChunker:
+    """
+    Incremental form of chunk_transcript.
+
+    Transcript items can be fed in any number of batches; each call only
+    touches the new items and returns the chunks that became complete.
+    """
+
+    def __init__(self, max_words: int = 150):
+        self.max_words = max_words
+        self.current_words: List[str] = []
+        self.word_count = 0
+        self.start_time: Optional[float] = None
+
+    def feed(self, items: List[Dict]) -> List[Dict]:
+        chunks = []
+
+        for item in items:
+            words = item["text"].split()
 
-    for item in transcript:
-        words = item["text"].split()
+            if self.start_time is None:
+                self.start_time = item["start"]
 
-        if start_time is None:
-            start_time = item["start"]
+            self.current_words.extend(words)
+            self.word_count += len(words)
 
-        current_words.extend(words)
-        word_count += len(words)
+            if self.word_count >= self.max_words:
+                end_time = item["start"] + item["duration"]
 
-        if word_count >= max_words:
-            end_time = item["start"] + item["duration"]
+                chunks.append({
+                    "text": " ".join(self.current_words),
+                    "start_time": round(self.start_time, 2),
+                    "end_time": round(end_time, 2)
+                })
 
-            chunks.append({
-                "text": " ".join(current_words),
-                "start_time": round(start_time, 2),
-                "end_time": round(end_time, 2)
-            })
+                self.current_words = []
+                self.word_count = 0
+                self.start_time = None
 
-            current_words = []
-            word_count = 0
-            start_time = None
+        return chunks
 
-    if current_words:
-        chunks.append({
-            "text": " ".join(current_words),
-            "start_time": round(start_time, 2),
-            "end_time": round(start_time + 5, 2)
-        })
+    def open_chunk(self) -> Optional[Dict]:
+        """The partially filled chunk, without finalizing it."""
+        if not self.current_words:
+            return None
+        return {
+            "text": " ".join(self.current_words),
+            "start_time": round(self.start_time, 2),
+            "end_time": round(self.start_time + 5, 2)
+        }
+
+    def flush(self) -> List[Dict]:
+        """Finalize the partially filled chunk, if any."""
+        chunk = self.open_chunk()
+        self.current_words = []
+        self.word_count = 0
+        self.start_time = None
+        return [chunk] if chunk else []
+
+
+def chunk_transcript(
+    transcript: List[Dict],
+    max_words: int = 150
+) -> List[Dict]:
 
-    return chunks
\ No newline at end of file
+    chunker = TranscriptChunker(max_words)
+    return chunker.feed(transcript) + chunker.flush()
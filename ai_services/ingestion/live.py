@@ -0,0 +1,431 @@
+import os
+import socket
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from transcript_extracter.transcript import list_transcript_tracks, resolve_track
+from ingestion.chunker import TranscriptChunker
+from ingestion.normalizer import TranscriptNormalizer
+from ingestion.pipeline import artifact_key, NORMALIZE_TRANSCRIPTS
+from store.artifact_store import get_store, TRANSCRIPT, CHUNKS, CHAPTERS, SUMMARY, QUESTIONS, LIVE
+from rag.faq_cache import FAQ
+from rag.study_pack import STUDY_PACK
+from vectorestore.corpus_index import get_corpus_index
+from scheduler.stages import STAGES
+
+# Seconds between transcript polls of a live stream
+LIVE_POLL_INTERVAL = float(os.getenv("LIVE_POLL_INTERVAL", "30"))
+
+# Consecutive polls without new segments before a session finalizes itself
+LIVE_IDLE_POLLS = int(os.getenv("LIVE_IDLE_POLLS", "20"))
+
+# Seconds between checks for a stop requested through the store
+LIVE_STOP_CHECK_INTERVAL = float(os.getenv("LIVE_STOP_CHECK_INTERVAL", "5"))
+
+# Artifacts other workers may have built from the partial transcript while
+# the stream was live; dropped when the session finalizes. Chapter
+# summaries are keyed by their text and stay valid.
+PARTIAL_KINDS = (CHUNKS, CHAPTERS, SUMMARY, QUESTIONS, FAQ, STUDY_PACK)
+
+
+def _worker_id() -> str:
+    # Computed per call: workers forked from a preloaded app share globals
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _owned_elsewhere(marker: Dict) -> bool:
+    """True if another worker holds an unexpired claim on the stream."""
+    return marker.get("owner") != _worker_id() and marker.get("expires_at", 0) > time.time()
+
+
+def fetch_live_segments(video_id: str, language: str = "en") -> Optional[Tuple[List[Dict], bool]]:
+    """
+    Fetch the current transcript of a live or growing video, as
+    (segments, is_generated).
+
+    Unlike fetch_youtube_transcript nothing is cached, not even the track
+    listing: captions may only appear some time into the stream, and the
+    track keeps growing between calls.
+    """
+    try:
+        listing = list_transcript_tracks(video_id, use_cache=False)
+        if listing is None:
+            return None
+
+        track, translate_to = resolve_track(listing, language)
+        if track is None:
+            return None
+        if translate_to is not None:
+            track = track.translate(translate_to)
+        return track.fetch().to_raw_data(), track.is_generated
+
+    except Exception as e:
+        print(f"Live transcript unavailable for {video_id}: {e}")
+        return None
+
+
+class LiveSession:
+    """
+    Incremental ingestion of one live stream.
+
+    Each poll only chunks the segments that arrived since the previous
+    poll: they are appended to the open chunk, full chunks are finalized,
+    and finalized chunks are appended to the corpus index and to the
+    session's own retrieval index in place. When the session stops, the
+    transcript and chunk set are written to the artifact store once so
+    the regular pipeline serves the video from then on.
+
+    Args:
+        video_id: YouTube video ID
+        language: Transcript language
+        poll_interval: Seconds between polls
+        max_words: Chunk size, as for load_chunks
+    """
+
+    def __init__(
+        self,
+        video_id: str,
+        language: str = "en",
+        poll_interval: float = LIVE_POLL_INTERVAL,
+        max_words: int = 150
+    ):
+        self.video_id = video_id
+        self.language = language
+        self.poll_interval = poll_interval
+        self.max_words = max_words
+        self.source_key = f"{artifact_key(video_id, language)}:live"
+
+        self.transcript: List[Dict] = []
+        self.chunks: List[Dict] = []
+        self._chunk_words: List[set] = []
+        self._chunker = TranscriptChunker(max_words)
+        # Created on the first ingest, once the track type is known
+        self._normalizer: Optional[TranscriptNormalizer] = None
+        self._last_start = -1.0
+
+        self.state = "running"
+        self.polls = 0
+        self.idle_polls = 0
+        self.started_at = time.time()
+        self.updated_at = None
+        self.error: Optional[str] = None
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._superseded = False
+        self._thread = threading.Thread(
+            target=self._run, name=f"live-{video_id}", daemon=True
+        )
+
+    def start(self) -> "LiveSession":
+        self._thread.start()
+        return self
+
+    def claim(self, current: Optional[Dict]) -> Dict:
+        """
+        New LIVE marker for this session, given the stored one; used with
+        ArtifactStore.update so only one worker polls a stream.
+
+        The marker tells every worker the transcript is still growing (see
+        live_in_progress), carries the session status for workers that do
+        not own it, and a stop flag any worker can set. It is renewed on
+        each poll, so the claim of a crashed worker expires on its own.
+        """
+        if current is not None and _owned_elsewhere(current):
+            return current
+        mine = current is not None and current.get("owner") == _worker_id()
+        return {
+            "owner": _worker_id(),
+            "expires_at": time.time() + 3 * self.poll_interval + 60,
+            "stop_requested": bool(mine and current.get("stop_requested")),
+            "status": self.status(),
+        }
+
+    def _renew(self) -> bool:
+        """Renew the claim; False once the session should stop polling."""
+        marker = get_store().update(
+            LIVE, artifact_key(self.video_id, self.language), self.claim, video_id=self.video_id
+        )
+        return self._keep_polling(marker)
+
+    def _keep_polling(self, marker: Optional[Dict]) -> bool:
+        if marker is None:
+            return True
+        if _owned_elsewhere(marker):
+            # Our claim expired and another worker took the stream over
+            self._superseded = True
+            return False
+        return not marker.get("stop_requested")
+
+    def _wait(self, seconds: float) -> bool:
+        """Sleep between polls; True if a stop arrived meanwhile."""
+        key = artifact_key(self.video_id, self.language)
+        deadline = time.monotonic() + seconds
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            if self._stop.wait(min(remaining, LIVE_STOP_CHECK_INTERVAL)):
+                return True
+            try:
+                if not self._keep_polling(get_store().get(LIVE, key)):
+                    return True
+            except Exception as e:
+                print(f"Live stop check failed for {self.video_id}: {e}")
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                added = self.poll()
+                self.idle_polls = 0 if added else self.idle_polls + 1
+            except Exception as e:
+                print(f"Live poll failed for {self.video_id}: {e}")
+                self.error = str(e)
+            try:
+                # Publishes the status of the poll that just ran
+                if not self._renew():
+                    break
+            except Exception as e:
+                print(f"Live claim renewal failed for {self.video_id}: {e}")
+            if self.idle_polls >= LIVE_IDLE_POLLS:
+                print(f"Live stream {self.video_id} stopped growing, finalizing")
+                break
+            if self._wait(self.poll_interval):
+                break
+        if self._superseded:
+            print(f"Live stream {self.video_id} is polled by another worker now")
+            with self._lock:
+                self.state = "superseded"
+            STAGES["index"].submit(lambda: get_corpus_index().remove(self.source_key))
+            _drop_session(self)
+            return
+        self.finalize()
+
+    def poll(self) -> int:
+        """Ingest segments published since the last poll; returns how many."""
+        fetched = fetch_live_segments(self.video_id, self.language)
+        self.polls += 1
+        if not fetched or not fetched[0]:
+            return 0
+        return self.ingest(*fetched)
+
+    def ingest(self, segments: List[Dict], is_generated: bool = True) -> int:
+        """
+        Append the segments that start after everything already ingested.
+        Rolling-caption overlaps are only merged for auto-generated tracks.
+
+        Segments are time ordered, so the new ones are a suffix of the
+        list and the scan stops at the first one already seen.
+        """
+        cut = len(segments)
+        while cut > 0 and segments[cut - 1]["start"] > self._last_start:
+            cut -= 1
+        new_segments = segments[cut:]
+        if not new_segments:
+            return 0
+
+        added = len(new_segments)
+        with self._lock:
+            self._last_start = new_segments[-1]["start"]
+            if self._normalizer is None and NORMALIZE_TRANSCRIPTS:
+                self._normalizer = TranscriptNormalizer(merge_overlaps=is_generated)
+            if self._normalizer is not None:
+                new_segments = self._normalizer.feed(new_segments)
+            self.transcript.extend(new_segments)
+            finalized = self._chunker.feed(new_segments)
+            self._append_chunks(finalized)
+            self.updated_at = time.time()
+        return added
+
+    def _append_chunks(self, chunks: List[Dict]) -> None:
+        if not chunks:
+            return
+        self.chunks.extend(chunks)
+        self._chunk_words.extend(set(chunk["text"].lower().split()) for chunk in chunks)
+        STAGES["index"].submit(
+            lambda: get_corpus_index().extend(self.source_key, self.video_id, chunks)
+        )
+
+    def current_chunks(self) -> List[Dict]:
+        """Finalized chunks plus the open chunk still being filled."""
+        with self._lock:
+            open_chunk = self._chunker.open_chunk()
+            return self.chunks + ([open_chunk] if open_chunk else [])
+
+    def retrieve(self, query: str, k: int = 5) -> List[Dict]:
+        """
+        Same ranking as retrieve_top_k, over word sets built once per
+        chunk as it is finalized. The open chunk is always a candidate.
+        """
+        query_words = set(query.lower().split())
+        with self._lock:
+            scored = [
+                (len(query_words & words), index)
+                for index, words in enumerate(self._chunk_words)
+            ]
+            candidates = list(self.chunks)
+            open_chunk = self._chunker.open_chunk()
+        if open_chunk:
+            scored.append((len(query_words & set(open_chunk["text"].lower().split())), len(candidates)))
+            candidates.append(open_chunk)
+        scored.sort(reverse=True, key=lambda x: x[0])
+        return [candidates[index] for _, index in scored[:k]]
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """Stop polling and wait for the session to finalize."""
+        self._stop.set()
+        if self._thread.is_alive() and threading.current_thread() is not self._thread:
+            self._thread.join(timeout)
+
+    def finalize(self) -> None:
+        """Close the open chunk and hand the video over to the store."""
+        with self._lock:
+            if self.state != "running":
+                return
+            self._append_chunks(self._chunker.flush())
+            self.state = "finished"
+            transcript, chunks = list(self.transcript), list(self.chunks)
+            meta = {"normalization": self._normalizer.summary()} if self._normalizer else None
+
+        store = get_store()
+        key = artifact_key(self.video_id, self.language)
+        self._drop_partial_artifacts(store, key)
+        # Keep the final status for other workers; the marker is expired,
+        # so live_in_progress is False from here on
+        store.put(
+            LIVE,
+            key,
+            {"owner": _worker_id(), "expires_at": time.time(), "stop_requested": False, "status": self.status()},
+            video_id=self.video_id
+        )
+        if chunks:
+            chunk_key = f"{key}:{self.max_words}"
+            store.put(TRANSCRIPT, key, transcript, video_id=self.video_id, meta=meta)
+            store.put(CHUNKS, chunk_key, chunks, video_id=self.video_id)
+
+            def swap_index():
+                index = get_corpus_index()
+                index.remove(self.source_key)
+                index.add(chunk_key, self.video_id, chunks)
+
+            STAGES["index"].submit(swap_index)
+
+        _drop_session(self)
+
+    def _drop_partial_artifacts(self, store, key: str) -> None:
+        # Chapters are re-segmented on the full transcript; unchanged
+        # chapters keep their cached summaries
+        for kind in PARTIAL_KINDS:
+            for entry in store.list_keys(kind, video_id=self.video_id):
+                stale = entry["key"] == key or entry["key"].startswith(f"{key}:")
+                if stale and ":chapter:" not in entry["key"] and ":chapters:" not in entry["key"]:
+                    store.delete(kind, entry["key"])
+
+    def status(self) -> Dict:
+        with self._lock:
+            open_chunk = self._chunker.open_chunk()
+            return {
+                "video_id": self.video_id,
+                "language": self.language,
+                "state": self.state,
+                "segments": len(self.transcript),
+                "chunks": len(self.chunks),
+                "open_chunk_words": self._chunker.word_count,
+                "latest_time": open_chunk["start_time"] if open_chunk else (
+                    self.chunks[-1]["end_time"] if self.chunks else None
+                ),
+                "polls": self.polls,
+                "poll_interval": self.poll_interval,
+                "started_at": self.started_at,
+                "updated_at": self.updated_at,
+                "error": self.error,
+                "worker": _worker_id(),
+                "normalization": self._normalizer.summary() if self._normalizer else None,
+            }
+
+
+_sessions: Dict[str, LiveSession] = {}
+_sessions_lock = threading.Lock()
+
+
+def _drop_session(session: LiveSession) -> None:
+    key = artifact_key(session.video_id, session.language)
+    with _sessions_lock:
+        if _sessions.get(key) is session:
+            del _sessions[key]
+
+
+def start_live_session(
+    video_id: str,
+    language: str = "en",
+    poll_interval: float = LIVE_POLL_INTERVAL
+) -> Dict:
+    """
+    Start polling a live stream, unless some worker already polls it.
+    Returns the status of the session polling the stream.
+    """
+    key = artifact_key(video_id, language)
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is not None:
+            return session.status()
+        session = LiveSession(video_id, language, poll_interval)
+        marker = get_store().update(LIVE, key, session.claim, video_id=video_id)
+        if _owned_elsewhere(marker):
+            return marker["status"]
+        _sessions[key] = session.start()
+        return session.status()
+
+
+def get_live_session(video_id: str, language: str = "en") -> Optional[LiveSession]:
+    """The session polling the stream, if this worker owns it."""
+    with _sessions_lock:
+        return _sessions.get(artifact_key(video_id, language))
+
+
+def live_session_status(video_id: str, language: str = "en") -> Optional[Dict]:
+    """
+    Status of the stream's session, from whichever worker polls it. A
+    finished session keeps its final status in the store.
+    """
+    session = get_live_session(video_id, language)
+    if session is not None:
+        return session.status()
+    marker = get_store().get(LIVE, artifact_key(video_id, language))
+    if marker is None or "status" not in marker:
+        return None
+    status = dict(marker["status"])
+    if status["state"] == "running":
+        if marker.get("expires_at", 0) <= time.time():
+            # The owning worker died without finalizing
+            status["state"] = "expired"
+        elif marker.get("stop_requested"):
+            status["state"] = "stopping"
+    return status
+
+
+def stop_live_session(video_id: str, language: str = "en") -> Optional[Dict]:
+    """
+    Stop the stream's session. Stopped here if this worker owns it;
+    otherwise the stop is flagged in the store and the owner finalizes
+    within LIVE_STOP_CHECK_INTERVAL seconds.
+    """
+    session = get_live_session(video_id, language)
+    if session is not None:
+        session.stop()
+        return session.status()
+
+    def request_stop(current: Optional[Dict]) -> Optional[Dict]:
+        if current is not None and _owned_elsewhere(current):
+            return dict(current, stop_requested=True)
+        return current
+
+    key = artifact_key(video_id, language)
+    store = get_store()
+    marker = store.get(LIVE, key)
+    if marker is None:
+        return None
+    if _owned_elsewhere(marker):
+        store.update(LIVE, key, request_stop, video_id=video_id)
+    return live_session_status(video_id, language)
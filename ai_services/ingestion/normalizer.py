@@ -0,0 +1,120 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+# Bracketed non-speech markers ("[Music]", "[Applause]", "(laughs)"),
+# music notes and speaker-change arrows
+_MARKER_RE = re.compile(r"\[[^\]]*\]|\((?:music|applause|laughter|laughs|inaudible|silence)[^)]*\)|[♪♫]+|>>", re.IGNORECASE)
+
+# Filler words, with the comma that usually follows them
+_FILLER_RE = re.compile(r"\b(?:um+|uh+|uhm+|erm+|hmm+|mm+|ah+)\b,?", re.IGNORECASE)
+
+_PUNCT_RE = re.compile(r"[^\w']+")
+
+# Longest rolling overlap looked for between consecutive lines, and the
+# shortest one trusted (shorter matches are usually real repetition, such
+# as "No." "No." or "it is what it is")
+MAX_OVERLAP_WORDS = 30
+MIN_OVERLAP_WORDS = 4
+
+
+def _key(word: str) -> str:
+    return _PUNCT_RE.sub("", word.lower())
+
+
+def _overlap(previous: List[str], current: List[str]) -> int:
+    """Number of leading words of current that repeat the end of previous."""
+    longest = min(len(previous), len(current), MAX_OVERLAP_WORDS)
+    for size in range(longest, MIN_OVERLAP_WORDS - 1, -1):
+        if previous[-size:] == current[:size]:
+            return size
+    return 0
+
+
+class TranscriptNormalizer:
+    """
+    Clean caption lines before chunking; like TranscriptChunker it can be
+    fed in batches (live streams) and only touches the new lines.
+
+    - Non-speech markers and filler words are removed.
+    - Rolling auto-captions, where a line repeats the end of the previous
+      one, are merged: the repeated words are dropped and a line that is
+      entirely repeated is folded into the previous line by extending its
+      duration, so timestamps still cover the speech. Only done with
+      merge_overlaps=True (auto-generated tracks); in manual captions and
+      Whisper output repeated words are real speech.
+    - Lines left empty are dropped.
+
+    Word counts before and after are kept in stats; whitespace-separated
+    words stand in for LLM tokens.
+    """
+
+    def __init__(self, merge_overlaps: bool = True):
+        self.merge_overlaps = merge_overlaps
+        self._previous: Optional[Dict] = None
+        self._previous_keys: List[str] = []
+        self.stats = {
+            "lines_in": 0,
+            "lines_out": 0,
+            "tokens_in": 0,
+            "tokens_out": 0,
+            "markers_removed": 0,
+            "fillers_removed": 0,
+            "overlap_tokens_removed": 0,
+        }
+
+    def feed(self, items: List[Dict]) -> List[Dict]:
+        normalized = []
+        for item in items:
+            text = item.get("text", "")
+            self.stats["lines_in"] += 1
+            self.stats["tokens_in"] += len(text.split())
+
+            text, markers = _MARKER_RE.subn(" ", text)
+            text, fillers = _FILLER_RE.subn(" ", text)
+            self.stats["markers_removed"] += markers
+            self.stats["fillers_removed"] += fillers
+
+            words = text.split()
+            keys = [_key(w) for w in words]
+            overlap = 0
+            if self.merge_overlaps and self._previous is not None:
+                overlap = _overlap(self._previous_keys, keys)
+            if overlap:
+                self.stats["overlap_tokens_removed"] += overlap
+                words, keys = words[overlap:], keys[overlap:]
+                if not words:
+                    # Pure repeat of the previous line: keep its time span
+                    end = item["start"] + item["duration"]
+                    self._previous["duration"] = round(
+                        max(self._previous["duration"], end - self._previous["start"]), 3
+                    )
+                    continue
+            if not words:
+                continue
+
+            line = {**item, "text": " ".join(words)}
+            normalized.append(line)
+            self._previous = line
+            # Rolling captions can repeat text spanning several lines
+            self._previous_keys = (self._previous_keys + keys)[-MAX_OVERLAP_WORDS:]
+            self.stats["lines_out"] += 1
+            self.stats["tokens_out"] += len(words)
+        return normalized
+
+    def summary(self) -> Dict:
+        saved = self.stats["tokens_in"] - self.stats["tokens_out"]
+        return {
+            **self.stats,
+            "tokens_saved": saved,
+            "percent_saved": round(100.0 * saved / self.stats["tokens_in"], 1) if self.stats["tokens_in"] else 0.0,
+        }
+
+
+def normalize_transcript(transcript: List[Dict], merge_overlaps: bool = True) -> Tuple[List[Dict], Dict]:
+    """
+    Return (normalized transcript, stats) for a fetched transcript.
+    See TranscriptNormalizer; pass merge_overlaps=False for manual tracks.
+    """
+    normalizer = TranscriptNormalizer(merge_overlaps)
+    normalized = normalizer.feed(transcript)
+    return normalized, normalizer.summary()
@@ -0,0 +1,190 @@
+import os
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Dict, List, Optional
+
+from transcript_extracter.transcript import fetch_youtube_track, transcribe_video
+from ingestion.chunker import chunk_transcript
+from ingestion.segmenter import segment_transcript
+from ingestion.normalizer import normalize_transcript
+from store.artifact_store import get_store, TRANSCRIPT, CHUNKS, CHAPTERS, LIVE
+from vectorestore.corpus_index import get_corpus_index
+from scheduler.stages import STAGES, run_stage_sync
+from rag.resilience import DeadlineExceeded, remaining_time
+
+# Transcripts with at least this many lines are chunked in the CPU process
+# pool; below it, pickling the transcript costs more than chunking it
+CPU_CHUNK_MIN_LINES = int(os.getenv("CPU_CHUNK_MIN_LINES", "20000"))
+
+# Transcribe videos without captions with Whisper (opt-in, CPU heavy)
+WHISPER_FALLBACK = os.getenv("WHISPER_FALLBACK", "0") == "1"
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "small")
+
+# Strip caption noise (rolling repeats, [Music], fillers) before storing
+NORMALIZE_TRANSCRIPTS = os.getenv("NORMALIZE_TRANSCRIPTS", "1") == "1"
+
+
+class TranscriptNotFound(LookupError):
+    """The video has no transcript in the requested language."""
+
+
+def artifact_key(video_id: str, language: str) -> str:
+    return f"{video_id}:{language}"
+
+
+def live_in_progress(video_id: str, language: str = "en") -> bool:
+    """
+    True while some worker is ingesting the video as a live stream. Its
+    transcript is still growing, so nothing built from it is stored.
+    """
+    marker = get_store().get(LIVE, artifact_key(video_id, language))
+    return marker is not None and marker.get("expires_at", 0) > time.time()
+
+
+# Whisper jobs running for this worker, by video; concurrent requests for
+# the same uncaptioned video wait on one job
+_whisper_jobs: Dict[str, Future] = {}
+_whisper_lock = threading.Lock()
+
+
+def _whisper_transcript(video_id: str) -> List[Dict]:
+    """
+    Transcribe a video in the CPU pool, joining the job already running
+    for it if there is one.
+
+    Waits at most until the request deadline; the job itself keeps
+    running and stores its result, so a retry picks it up.
+    """
+    with _whisper_lock:
+        job = _whisper_jobs.get(video_id)
+        started = job is None
+        if started:
+            job = _whisper_jobs[video_id] = STAGES["cpu"].submit(transcribe_video, video_id, WHISPER_MODEL)
+    if started:
+        # Outside the lock: the callback runs at once if the job is already done
+        job.add_done_callback(lambda _: _forget_whisper_job(video_id, job))
+
+    try:
+        return job.result(timeout=remaining_time())
+    except FutureTimeout:
+        raise DeadlineExceeded(f"Request deadline exceeded while transcribing {video_id}; transcription continues in the background")
+
+
+def _forget_whisper_job(video_id: str, job: Future) -> None:
+    with _whisper_lock:
+        if _whisper_jobs.get(video_id) is job:
+            del _whisper_jobs[video_id]
+
+
+def _index_chunks(key: str, video_id: str, chunks: List[Dict]) -> None:
+    get_corpus_index().add(key, video_id, chunks)
+
+
+def load_transcript(video_id: str, language: str = "en") -> Optional[List[Dict]]:
+    """
+    Return the transcript for a video, fetching it from YouTube only when
+    no worker has stored it yet. With WHISPER_FALLBACK=1, videos without
+    captions are transcribed from their audio.
+
+    Fetched transcripts are normalized (see normalize_transcript) before
+    they are stored; the normalization stats are kept as the stored
+    transcript's metadata.
+    """
+    store = get_store()
+    key = artifact_key(video_id, language)
+    transcript = store.get(TRANSCRIPT, key)
+    if transcript is not None:
+        return transcript
+
+    transcript, rolling_captions = fetch_youtube_track(video_id, language=language) or (None, False)
+    if not transcript and WHISPER_FALLBACK:
+        # Slow path: transcribe the audio in the CPU process pool
+        try:
+            transcript = _whisper_transcript(video_id)
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            print(f"Whisper fallback failed for {video_id}: {e}")
+    if transcript:
+        meta = None
+        if NORMALIZE_TRANSCRIPTS:
+            # Overlap merging is for rolling auto-captions only
+            transcript, stats = normalize_transcript(transcript, merge_overlaps=rolling_captions)
+            meta = {"normalization": stats}
+            print(f"Normalized transcript {key}: {stats['tokens_saved']} tokens saved ({stats['percent_saved']}%)")
+        if transcript and not live_in_progress(video_id, language):
+            store.put(TRANSCRIPT, key, transcript, video_id=video_id, meta=meta)
+    return transcript
+
+
+def transcript_stats(video_id: str, language: str = "en") -> Optional[Dict]:
+    """Normalization stats of a stored transcript, if it was normalized."""
+    key = artifact_key(video_id, language)
+    for entry in get_store().list_keys(TRANSCRIPT, video_id=video_id):
+        if entry["key"] == key:
+            return (entry["meta"] or {}).get("normalization")
+    return None
+
+
+def load_chunks(
+    video_id: str,
+    language: str = "en",
+    transcript: Optional[List[Dict]] = None,
+    max_words: int = 150
+) -> List[Dict]:
+    """
+    Return the chunk set for a video, chunking the transcript on a miss.
+
+    Args:
+        video_id: YouTube video ID
+        language: Transcript language
+        transcript: Already loaded transcript, avoids a second lookup
+        max_words: Chunk size passed to chunk_transcript
+    """
+    store = get_store()
+    key = f"{artifact_key(video_id, language)}:{max_words}"
+    chunks = store.get(CHUNKS, key)
+    if chunks is not None:
+        return chunks
+
+    if transcript is None:
+        transcript = load_transcript(video_id, language)
+    if not transcript:
+        return []
+
+    if len(transcript) >= CPU_CHUNK_MIN_LINES:
+        chunks = run_stage_sync("cpu", chunk_transcript, transcript, max_words)
+    else:
+        chunks = chunk_transcript(transcript, max_words=max_words)
+    if chunks and not live_in_progress(video_id, language):
+        store.put(CHUNKS, key, chunks, video_id=video_id)
+        # Indexing happens off the request path on the index stage
+        STAGES["index"].submit(_index_chunks, key, video_id, chunks)
+    return chunks
+
+
+def load_chapters(
+    video_id: str,
+    language: str = "en",
+    transcript: Optional[List[Dict]] = None
+) -> List[Dict]:
+    """
+    Return the topical chapters of a video, segmenting the transcript on
+    a miss. See segment_transcript for the chapter format.
+    """
+    store = get_store()
+    key = artifact_key(video_id, language)
+    chapters = store.get(CHAPTERS, key)
+    if chapters is not None:
+        return chapters
+
+    if transcript is None:
+        transcript = load_transcript(video_id, language)
+    if not transcript:
+        return []
+
+    chapters = segment_transcript(transcript)
+    if chapters and not live_in_progress(video_id, language):
+        store.put(CHAPTERS, key, chapters, video_id=video_id)
+    return chapters
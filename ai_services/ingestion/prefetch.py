@@ -0,0 +1,176 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import yt_dlp
+
+from ingestion.pipeline import load_transcript, load_chunks
+from rag.summarizer import summary_for_video
+from rag.question_generator import questions_for_video
+from store.artifact_store import get_store
+from scheduler.stages import run_stage_sync
+
+PREFETCH_JOB = "prefetch_job"
+
+# Upper bound on videos being ingested at once by this worker, across all jobs
+PREFETCH_CONCURRENCY = int(os.getenv("PREFETCH_CONCURRENCY", "4"))
+
+_executor = ThreadPoolExecutor(
+    max_workers=PREFETCH_CONCURRENCY,
+    thread_name_prefix="prefetch"
+)
+
+
+def expand_source(url: str, max_videos: int = 200) -> List[str]:
+    """
+    Expand a playlist or channel URL into video IDs using yt_dlp flat extraction.
+
+    Only the listing pages are downloaded; no video metadata is resolved.
+    Channel tabs (Videos, Live, Shorts) are followed one level deep.
+    """
+    ydl_opts = {
+        "extract_flat": True,
+        "quiet": True,
+        "skip_download": True,
+        "playlistend": max_videos,
+    }
+
+    video_ids: List[str] = []
+    seen = set()
+
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        pending = [(url, 0)]
+        while pending and len(video_ids) < max_videos:
+            page_url, depth = pending.pop(0)
+            info = ydl.extract_info(page_url, download=False) or {}
+
+            if info.get("_type") not in ("playlist", "multi_video"):
+                # A single video URL expands to itself
+                if info.get("id") and info["id"] not in seen:
+                    seen.add(info["id"])
+                    video_ids.append(info["id"])
+                continue
+
+            for entry in info.get("entries") or []:
+                if not entry or len(video_ids) >= max_videos:
+                    continue
+                if entry.get("ie_key") == "Youtube":
+                    if entry["id"] not in seen:
+                        seen.add(entry["id"])
+                        video_ids.append(entry["id"])
+                elif depth < 1 and entry.get("url"):
+                    pending.append((entry["url"], depth + 1))
+
+    return video_ids
+
+
+class PrefetchJob:
+    """
+    Background ingestion of every video behind a playlist or channel URL.
+
+    Job state is written to the artifact store after every video so any
+    worker can report progress for it.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        language: str = "en",
+        summarize: bool = False,
+        questions: bool = False,
+        max_videos: int = 200
+    ):
+        self.job_id = uuid.uuid4().hex
+        self.url = url
+        self.language = language
+        self.summarize = summarize
+        self.questions = questions
+        self.max_videos = max_videos
+        self._lock = threading.Lock()
+        self.state = {
+            "job_id": self.job_id,
+            "url": url,
+            "language": language,
+            "status": "pending",
+            "video_ids": [],
+            "completed": [],
+            "failed": {},
+            "created_at": time.time(),
+            "finished_at": None,
+        }
+
+    def _save(self) -> None:
+        get_store().put(PREFETCH_JOB, self.job_id, self.state)
+
+    def _update(self, **fields) -> None:
+        with self._lock:
+            self.state.update(fields)
+            self._save()
+
+    def start(self) -> None:
+        self._save()
+        threading.Thread(
+            target=self._run,
+            name=f"prefetch-{self.job_id[:8]}",
+            daemon=True
+        ).start()
+
+    def _run(self) -> None:
+        try:
+            self._update(status="expanding")
+            video_ids = expand_source(self.url, self.max_videos)
+            self._update(status="running", video_ids=video_ids)
+
+            futures = [
+                _executor.submit(self._ingest, video_id)
+                for video_id in self.state["video_ids"]
+            ]
+            for future in futures:
+                future.result()
+            self._update(status="completed", finished_at=time.time())
+        except Exception as e:
+            print(f"Prefetch job {self.job_id} failed: {e}")
+            self._update(status="failed", error=str(e), finished_at=time.time())
+
+    def _ingest(self, video_id: str) -> None:
+        try:
+            # Stage executors are shared with live requests, so prefetch
+            # work queues behind them instead of adding threads of its own
+            transcript = run_stage_sync("fetch", load_transcript, video_id, self.language)
+            if not transcript:
+                raise ValueError("No transcript available")
+            chunks = run_stage_sync("chunk", load_chunks, video_id, self.language, transcript=transcript)
+
+            if self.summarize:
+                run_stage_sync("generate", summary_for_video, video_id, self.language, chunks)
+            if self.questions:
+                run_stage_sync("generate", questions_for_video, video_id, self.language, chunks)
+
+            with self._lock:
+                self.state["completed"].append(video_id)
+                self._save()
+        except Exception as e:
+            print(f"Prefetch of {video_id} failed: {e}")
+            with self._lock:
+                self.state["failed"][video_id] = str(e)
+                self._save()
+
+
+def start_prefetch(
+    url: str,
+    language: str = "en",
+    summarize: bool = False,
+    questions: bool = False,
+    max_videos: int = 200
+) -> Dict:
+    """Start a background prefetch job and return its initial state."""
+    job = PrefetchJob(url, language, summarize, questions, max_videos)
+    job.start()
+    return job.state
+
+
+def get_prefetch_job(job_id: str) -> Optional[Dict]:
+    return get_store().get(PREFETCH_JOB, job_id)
@@ -0,0 +1,160 @@
+from typing import Dict, List
+
+import numpy as np
+
+from vectorestore.corpus_index import tokenize
+
+# Tokens per pseudo-sentence and pseudo-sentences per comparison block
+# (TextTiling's w and k)
+SEQUENCE_TOKENS = 20
+BLOCK_SEQUENCES = 10
+
+# No chapter boundary is placed closer than this (seconds) to another
+MIN_CHAPTER_SECONDS = 90.0
+
+# Width of the moving average applied to gap scores, and the smallest
+# valley depth (in cosine similarity) that can become a boundary
+SMOOTHING_WIDTH = 3
+MIN_DEPTH = 0.15
+
+# Only the most frequent terms are compared, bounding the dense block
+# matrices for very long transcripts
+MAX_VOCABULARY = 2000
+
+
+def _sequence_matrix(transcript: List[Dict]):
+    """
+    Split the transcript's tokens into fixed-size pseudo-sentences.
+
+    Returns the term count matrix (one row per pseudo-sentence) and the
+    index of the transcript item each pseudo-sentence starts in.
+    """
+    vocabulary: Dict[str, int] = {}
+    token_ids: List[int] = []
+    token_items: List[int] = []
+    for position, item in enumerate(transcript):
+        for token in tokenize(item.get("text", "")):
+            token_ids.append(vocabulary.setdefault(token, len(vocabulary)))
+            token_items.append(position)
+
+    n_sequences = len(token_ids) // SEQUENCE_TOKENS
+    if n_sequences == 0:
+        return np.zeros((0, 0), dtype=np.float32), np.zeros(0, dtype=np.int64)
+
+    ids = np.asarray(token_ids[:n_sequences * SEQUENCE_TOKENS], dtype=np.int64)
+    rows = np.arange(len(ids)) // SEQUENCE_TOKENS
+    frequency = np.bincount(ids, minlength=len(vocabulary))
+    kept = np.argsort(-frequency, kind="stable")[:MAX_VOCABULARY]
+    column = np.full(len(vocabulary), -1, dtype=np.int64)
+    column[kept] = np.arange(len(kept))
+    mask = column[ids] >= 0
+
+    counts = np.zeros((n_sequences, len(kept)), dtype=np.float32)
+    np.add.at(counts, (rows[mask], column[ids[mask]]), 1.0)
+    starts = np.asarray(token_items[::SEQUENCE_TOKENS][:n_sequences], dtype=np.int64)
+    return counts, starts
+
+
+def gap_scores(counts: np.ndarray, block: int = BLOCK_SEQUENCES) -> np.ndarray:
+    """
+    Lexical cohesion across every gap between pseudo-sentences.
+
+    Gap g lies before sequence g; its score is the cosine similarity of
+    the term counts of the `block` sequences on either side. All block
+    vectors come from one cumulative sum, so the cost is linear in the
+    transcript length.
+    """
+    n = len(counts)
+    if n < 2:
+        return np.zeros(0, dtype=np.float32)
+
+    cumulative = np.vstack([np.zeros((1, counts.shape[1]), dtype=np.float32), np.cumsum(counts, axis=0)])
+    gaps = np.arange(1, n)
+    left = cumulative[gaps] - cumulative[np.maximum(gaps - block, 0)]
+    right = cumulative[np.minimum(gaps + block, n)] - cumulative[gaps]
+
+    dot = np.einsum("ij,ij->i", left, right)
+    norms = np.linalg.norm(left, axis=1) * np.linalg.norm(right, axis=1)
+    return dot / np.where(norms == 0, 1.0, norms)
+
+
+def depth_scores(scores: np.ndarray) -> np.ndarray:
+    """
+    How deep each valley of the gap scores is: the climb to the highest
+    score on its left plus the climb to the highest score on its right,
+    where each side stops at the first score lower than the one before
+    it. Gaps that are not a valley bottom score 0.
+    """
+    n = len(scores)
+    # Index of the peak reached climbing from each gap; a gap whose
+    # neighbour is at least as high climbs on from that neighbour's peak
+    left_peak = np.arange(n)
+    for i in range(1, n):
+        if scores[i - 1] >= scores[i]:
+            left_peak[i] = left_peak[i - 1]
+    right_peak = np.arange(n)
+    for i in range(n - 2, -1, -1):
+        if scores[i + 1] >= scores[i]:
+            right_peak[i] = right_peak[i + 1]
+    depths = (scores[left_peak] - scores) + (scores[right_peak] - scores)
+
+    # Only valley bottoms are boundary candidates
+    valleys = np.zeros(n, dtype=bool)
+    if n > 2:
+        valleys[1:-1] = (scores[1:-1] < scores[:-2]) & (scores[1:-1] <= scores[2:])
+    return np.where(valleys, depths, 0.0)
+
+
+def segment_transcript(transcript: List[Dict], min_seconds: float = MIN_CHAPTER_SECONDS) -> List[Dict]:
+    """
+    Split a transcript into topical chapters, TextTiling style.
+
+    Gap scores are smoothed, and boundaries are placed at valleys whose
+    depth exceeds mean - std / 2 of all valley depths (and MIN_DEPTH),
+    deepest first, keeping chapters at least `min_seconds` long.
+
+    Args:
+        transcript: Transcript items with 'text', 'start' and 'duration'
+        min_seconds: Minimum chapter length
+
+    Returns:
+        Chapters with 'index', 'start_time', 'end_time', 'start_item',
+        'end_item' (exclusive) and 'text', in timeline order
+    """
+    if not transcript:
+        return []
+
+    counts, starts = _sequence_matrix(transcript)
+    scores = gap_scores(counts)
+    boundaries: List[int] = []
+    if len(scores) > SMOOTHING_WIDTH:
+        scores = np.convolve(scores, np.ones(SMOOTHING_WIDTH) / SMOOTHING_WIDTH, mode="same")
+    depths = depth_scores(scores)
+    valley_depths = depths[depths > 0]
+    if len(valley_depths):
+        cutoff = max(valley_depths.mean() - valley_depths.std() / 2, MIN_DEPTH)
+        end = transcript[-1]["start"] + transcript[-1]["duration"]
+        taken_times = [transcript[0]["start"], end]
+        for gap in np.argsort(-depths):
+            if depths[gap] < cutoff:
+                break
+            item = int(starts[gap + 1])
+            start = transcript[item]["start"]
+            # Both neighbouring chapters must stay long enough
+            if all(abs(start - t) >= min_seconds for t in taken_times):
+                taken_times.append(start)
+                boundaries.append(item)
+
+    edges = [0] + sorted(boundaries) + [len(transcript)]
+    chapters = []
+    for index, (first, last) in enumerate(zip(edges, edges[1:])):
+        items = transcript[first:last]
+        chapters.append({
+            "index": index,
+            "start_time": round(items[0]["start"], 2),
+            "end_time": round(items[-1]["start"] + items[-1]["duration"], 2),
+            "start_item": first,
+            "end_item": last,
+            "text": " ".join(item["text"] for item in items),
+        })
+    return chapters
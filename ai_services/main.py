@@ -1,20 +1,35 @@
 # main.py
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import Depends, FastAPI, Header, HTTPException, Query
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel, Field, model_validator
-from typing import Optional
+from typing import Literal, Optional
+from datetime import datetime
+import math
+import os
 import re
 import json
-from reports.report import export_report
+from reports.report import build_report, iter_reports, stream_ndjson, stream_zip
 
 # Internal imports
-from rag.question_generator import generate_questions
-from transcript_extracter.transcript import fetch_youtube_transcript
-from ingestion.chunker import chunk_transcript
-from vectorestore.retriever import retrieve_top_k
-from rag.summarizer import generate_summary
+from rag.question_generator import questions_for_video
+from ingestion.pipeline import load_transcript, load_chunks, load_chapters, transcript_stats, TranscriptNotFound
+from store.artifact_store import get_store
+from rag.summarizer import summary_for_video
+from rag.chapters import summarize_chapters, summary_from_chapters
+from rag.study_pack import study_pack_for_video, StudyPackRequest, StudyPackResponse
 from rag.evaluator import evaluate_answers
 from rag.chat import chat_with_video, ChatRequest, ChatResponse
+from rag.faq_cache import faq_cache
+from rag.batch_chat import chat_with_video_batch, BatchChatRequest, BatchChatResponse
+from ingestion.prefetch import start_prefetch, get_prefetch_job
+from ingestion.live import start_live_session, live_session_status, stop_live_session
+from vectorestore.corpus_index import get_corpus_index
+from rag.resilience import CircuitOpenError, DeadlineExceeded, request_deadline
+from scheduler.stages import run_stage, stage_metrics
+from scheduler.admission import AdmissionMiddleware, admission_metrics
+from scheduler.profiling import ProfilingMiddleware, PROFILE_TOKEN, list_profiles, get_profile, profile_token_valid
+from rag.gemini_client import gemini_breaker
+from rag.llm import llm_metrics
 
 
 app = FastAPI(
@@ -23,6 +38,39 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Default time budget of a request, overridable per request (downwards
+# only) with the X-Request-Timeout header, in seconds
+REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE", "120"))
+
+
+class DeadlineMiddleware:
+    """Run every HTTP request inside a request_deadline."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        budget = REQUEST_DEADLINE
+        for name, value in scope.get("headers", []):
+            if name == b"x-request-timeout":
+                try:
+                    budget = min(budget, max(float(value), 0.0))
+                except ValueError:
+                    pass
+        with request_deadline(budget):
+            await self.app(scope, receive, send)
+
+
+# Admission runs inside the deadline so it can compare queue wait with
+# the remaining budget (the middleware added last is the outermost).
+# Profiling is outermost so a profile includes admission queueing.
+app.add_middleware(AdmissionMiddleware)
+app.add_middleware(DeadlineMiddleware)
+app.add_middleware(ProfilingMiddleware)
+
 
 class TranscriptRequest(BaseModel):
     url: Optional[str] = Field(
@@ -45,6 +93,7 @@ class TranscriptResponse(BaseModel):
     video_id: str
     language: str
     transcript: list
+    normalization: Optional[dict] = None
     message: str = "Transcript retrieved successfully"
 
 @app.post("/transcript", response_model=TranscriptResponse)
@@ -59,7 +108,7 @@ async def get_transcript(request: TranscriptRequest):
             raise HTTPException(status_code=400, detail="Invalid YouTube URL or video ID")
 
         # 2️⃣ Fetch transcript
-        transcript_data = fetch_youtube_transcript(video_id, language=request.language)
+        transcript_data = await run_stage("fetch", load_transcript, video_id, request.language)
         if not transcript_data:
             raise HTTPException(
                 status_code=404,
@@ -69,7 +118,8 @@ async def get_transcript(request: TranscriptRequest):
         return TranscriptResponse(
             video_id=video_id,
             language=request.language,
-            transcript=transcript_data
+            transcript=transcript_data,
+            normalization=await run_stage("fetch", transcript_stats, video_id, request.language)
         )
 
     except HTTPException:
@@ -94,6 +144,17 @@ class SummarizeRequest(BaseModel):
         description="YouTube video ID (11 characters)"
     )
     language: str = "en"
+    selection: Literal["coverage", "query", "chapters"] = Field(
+        "coverage",
+        description=(
+            "'coverage' spreads chunks across the timeline, 'query' ranks them by word overlap, "
+            "'chapters' builds the summary from cached per-chapter summaries"
+        )
+    )
+    mode: Literal["llm", "fast"] = Field(
+        "llm",
+        description="'llm' summarizes with the LLM, 'fast' returns an extractive summary without an LLM call"
+    )
 
     @model_validator(mode="after")
     def validate_input(self):
@@ -114,6 +175,7 @@ class SummaryResponse(BaseModel):
 class ReportRequest(BaseModel):
     video_id: str = Field(..., description="YouTube video ID (11 characters)")
     evaluation_text: str = Field(..., description="The evaluation text to convert to a report")
+    class_id: Optional[str] = Field(None, description="Class the evaluation belongs to, used by bulk export")
 # Add this endpoint with other route handlers
 @app.post("/generate-report")
 async def generate_report(request: ReportRequest):
@@ -122,14 +184,18 @@ async def generate_report(request: ReportRequest):
     The report includes score, correct/incorrect answers, weak areas, and understanding level.
     """
     try:
-        # Generate the report file
-        file_path = export_report(request.video_id, request.evaluation_text)
-        
-        # Return the file for download
-        return FileResponse(
-            file_path,
+        # Build the report in memory (it is also kept in the artifact store)
+        report = await run_stage(
+            "fetch", build_report, request.video_id, request.evaluation_text, request.class_id
+        )
+
+        # Return it for download without touching the disk
+        return Response(
+            content=json.dumps(report, indent=4, ensure_ascii=False),
             media_type='application/json',
-            filename=f"evaluation_report_{request.video_id}.json"
+            headers={
+                "Content-Disposition": f'attachment; filename="evaluation_report_{request.video_id}.json"'
+            }
         )
     except json.JSONDecodeError as je:
         raise HTTPException(
@@ -141,6 +207,34 @@ async def generate_report(request: ReportRequest):
             status_code=500,
             detail=f"Error generating report: {str(e)}"
         )
+
+
+@app.get("/reports/export")
+def export_reports(
+    video_id: Optional[str] = Query(None, description="Only reports for this video"),
+    class_id: Optional[str] = Query(None, description="Only reports for this class"),
+    since: Optional[datetime] = Query(None, description="Reports generated at or after this time"),
+    until: Optional[datetime] = Query(None, description="Reports generated before this time"),
+    format: Literal["ndjson", "zip"] = Query("ndjson")
+):
+    """
+    Stream every stored evaluation report matching the filters as NDJSON or
+    as a zip built on the fly. Reports are read and encoded one at a time,
+    so memory use does not grow with the number of reports.
+    """
+    reports = iter_reports(
+        video_id=video_id,
+        class_id=class_id,
+        since=since.timestamp() if since else None,
+        until=until.timestamp() if until else None
+    )
+    if format == "zip":
+        return StreamingResponse(
+            stream_zip(reports),
+            media_type="application/zip",
+            headers={"Content-Disposition": 'attachment; filename="evaluation_reports.zip"'}
+        )
+    return StreamingResponse(stream_ndjson(reports), media_type="application/x-ndjson")
 # -------------------------
 # Utility Functions
 # -------------------------
@@ -182,7 +276,56 @@ def root():
 
 @app.get("/health")
 def health():
-    return {"status": "healthy"}
+    return {"status": "healthy", "gemini_circuit": gemini_breaker.snapshot(), "llm": llm_metrics()}
+
+
+@app.get("/metrics/stages")
+def pipeline_stage_metrics():
+    """Queue depth, concurrency and timings of every pipeline stage."""
+    return stage_metrics()
+
+
+@app.get("/metrics/llm")
+def llm_provider_metrics():
+    """Latency, error rate and routing order of every LLM provider."""
+    return llm_metrics()
+
+
+@app.get("/metrics/admission")
+def admission_control_metrics():
+    """Slots, queue depth and rejections per priority class, and LLM provider slot usage."""
+    return admission_metrics()
+
+
+def require_profile_token(x_profile_token: Optional[str] = Header(None)) -> None:
+    if not PROFILE_TOKEN:
+        raise HTTPException(status_code=404, detail="Profiling is disabled; set PROFILE_TOKEN to enable it")
+    if not profile_token_valid(x_profile_token):
+        raise HTTPException(status_code=403, detail="Invalid or missing X-Profile-Token")
+
+
+@app.get("/admin/profiles", dependencies=[Depends(require_profile_token)])
+def admin_profiles():
+    """
+    Stored request profiles, newest first. Profile a request by sending
+    'X-Profile: 1' or adding '?profile=1', with the X-Profile-Token header.
+    """
+    return {"profiles": list_profiles()}
+
+
+@app.get("/admin/profiles/{profile_id}", dependencies=[Depends(require_profile_token)])
+def admin_profile(profile_id: str):
+    """Span tree and folded stack samples of one profiled request."""
+    profile = get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"Unknown profile '{profile_id}'")
+    return profile
+
+
+@app.get("/artifacts/stats")
+def artifact_stats():
+    """Size and entry counts of the shared artifact store, per kind."""
+    return get_store().stats()
 
 
 @app.post("/chat", response_model=ChatResponse)
@@ -199,6 +342,16 @@ async def chat_with_video_endpoint(request: ChatRequest):
         response = await chat_with_video(request)
         return response
         
+    except TranscriptNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except CircuitOpenError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))}
+        )
     except ValueError as ve:
         print(f"Validation error: {ve}")
         raise HTTPException(status_code=400, detail=str(ve))
@@ -207,8 +360,38 @@ async def chat_with_video_endpoint(request: ChatRequest):
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
+@app.get("/chat/faq/stats")
+def faq_cache_stats():
+    """Hit rate of the per-video FAQ answer cache on this worker."""
+    return faq_cache.stats()
+
+
+@app.post("/chat/batch", response_model=BatchChatResponse)
+async def chat_batch_endpoint(request: BatchChatRequest):
+    """
+    Answer many questions about one video with shared retrieval and
+    packed LLM calls. Each answer lists the chunks it relied on.
+    """
+    try:
+        return await chat_with_video_batch(request)
+    except TranscriptNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except CircuitOpenError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))}
+        )
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
 @app.post("/summarize", response_model=SummaryResponse)
-def summarize_video(request: SummarizeRequest):
+async def summarize_video(request: SummarizeRequest):
     try:
         # 1️⃣ Resolve video_id
         video_id = request.video_id or extract_video_id(request.url)
@@ -216,7 +399,7 @@ def summarize_video(request: SummarizeRequest):
             raise HTTPException(status_code=400, detail="Invalid YouTube URL or video ID")
 
         # 2️⃣ Fetch transcript
-        transcript_data = fetch_youtube_transcript(video_id, language=request.language)
+        transcript_data = await run_stage("fetch", load_transcript, video_id, request.language)
         if not transcript_data:
             raise HTTPException(
                 status_code=404,
@@ -224,30 +407,29 @@ def summarize_video(request: SummarizeRequest):
             )
 
         # 3️⃣ Chunk transcript
-        chunks = chunk_transcript(transcript_data)
+        chunks = await run_stage("chunk", load_chunks, video_id, request.language, transcript=transcript_data)
         if not chunks:
             raise HTTPException(status_code=500, detail="Transcript chunking failed")
 
-        # 4️⃣ Retrieve top-K relevant chunks
-        retrieved_chunks = retrieve_top_k(
-            chunks=chunks,
-            query=(
-                "Provide a clear and concise summary of the entire video, "
-                "highlighting key points, events, and the main takeaway."
-            ),
-            k=8
-        )
-
-        # 5️⃣ Generate summary
+        # 4️⃣ Retrieve top-K relevant chunks and 5️⃣ generate summary
+        # (shared across workers through the artifact store)
         try:
-            summary_result = generate_summary(retrieved_chunks)
-            
-            # Debugging: Print the summary result
-            print("Summary result:", summary_result)
-            
-            # Ensure we have valid summary content
-            if not summary_result or not isinstance(summary_result, dict):
-                raise ValueError("Invalid summary format generated")
+            if request.selection == "chapters" and request.mode == "llm":
+                chapters = await run_stage("chunk", load_chapters, video_id, request.language, transcript=transcript_data)
+                chapters = await summarize_chapters(video_id, request.language, chapters)
+                summary_result = await run_stage(
+                    "generate", summary_from_chapters, video_id, request.language, chapters
+                )
+                retrieved_chunks = chapters
+            else:
+                # Fast mode is local compute, LLM mode waits on the LLM provider
+                summary_result, retrieved_chunks = await run_stage(
+                    "retrieve" if request.mode == "fast" else "generate",
+                    summary_for_video,
+                    video_id, request.language, chunks,
+                    selection=request.selection,
+                    mode=request.mode
+                )
                 
             paragraph = summary_result.get("paragraph", "No summary available")
             bullets = summary_result.get("bullets", [])
@@ -268,6 +450,11 @@ def summarize_video(request: SummarizeRequest):
                 transcript_lines=len(transcript_data),
                 total_chunks=len(chunks),
                 retrieved_chunks_used=len(retrieved_chunks),
+                message=(
+                    "Extractive summary generated"
+                    if summary_result.get("mode") == "extractive"
+                    else "Summary generated successfully"
+                )
             )
             
         except Exception as e:
@@ -304,6 +491,10 @@ class QuestionRequest(BaseModel):
     url: Optional[str] = None
     video_id: Optional[str] = None
     language: str = "en"
+    selection: Literal["coverage", "query"] = Field(
+        "coverage",
+        description="'coverage' spreads chunks across the timeline, 'query' ranks them by word overlap"
+    )
     @model_validator(mode="after")
     def validate_input(self):
         if not self.url and not self.video_id:
@@ -311,32 +502,29 @@ class QuestionRequest(BaseModel):
         return self
 # Add this endpoint (place it with other route handlers)
 @app.post("/questions")
-def generate_video_questions(request: QuestionRequest):
+async def generate_video_questions(request: QuestionRequest):
     try:
         # 1️⃣ Resolve video_id
         video_id = request.video_id or extract_video_id(request.url)
         if not video_id:
             raise HTTPException(status_code=400, detail="Invalid YouTube URL or video ID")
         # 2️⃣ Fetch transcript
-        transcript_data = fetch_youtube_transcript(video_id, language=request.language)
+        transcript_data = await run_stage("fetch", load_transcript, video_id, request.language)
         if not transcript_data:
             raise HTTPException(
                 status_code=404,
                 detail=f"No transcript found for video '{video_id}' in language '{request.language}'"
             )
         # 3️⃣ Chunk transcript
-        chunks = chunk_transcript(transcript_data)
+        chunks = await run_stage("chunk", load_chunks, video_id, request.language, transcript=transcript_data)
         if not chunks:
             raise HTTPException(status_code=500, detail="Transcript chunking failed")
-        # 4️⃣ Retrieve relevant chunks
-        retrieved_chunks = retrieve_top_k(
-            chunks=chunks,
-            query="Generate educational questions about this content",
-            k=5
+        # 4️⃣ Retrieve relevant chunks and 5️⃣ generate questions
+        questions, retrieved_chunks = await run_stage(
+            "generate",
+            questions_for_video,
+            video_id, request.language, chunks, selection=request.selection
         )
-        
-        # 5️⃣ Generate questions
-        questions = generate_questions(retrieved_chunks)
         return {
             "video_id": video_id,
             "language": request.language,
@@ -351,6 +539,246 @@ def generate_video_questions(request: QuestionRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+@app.post("/study-pack", response_model=StudyPackResponse)
+async def video_study_pack(request: StudyPackRequest):
+    """
+    Summary paragraph, key points, MCQs and descriptive questions for a
+    video in one response: the transcript is ingested once and the pack
+    is generated by a single structured LLM call and cached as a unit.
+    """
+    try:
+        video_id = request.video_id or extract_video_id(request.url)
+        transcript_data = await run_stage("fetch", load_transcript, video_id, request.language)
+        if not transcript_data:
+            raise HTTPException(
+                status_code=404,
+                detail=f"No transcript found for video '{video_id}' in language '{request.language}'"
+            )
+        chunks = await run_stage("chunk", load_chunks, video_id, request.language, transcript=transcript_data)
+        if not chunks:
+            raise HTTPException(status_code=500, detail="Transcript chunking failed")
+
+        pack, cached = await study_pack_for_video(video_id, request.language, chunks)
+        bullet_text = "\n".join(f"• {bullet}" for bullet in pack["bullets"])
+        if cached:
+            message = "Study pack served from cache"
+        elif not pack["mcqs"] or not pack["descriptive_questions"]:
+            message = "Study pack generated without questions: question generation failed"
+        elif pack.get("mode") == "extractive":
+            message = "Study pack generated with an extractive summary"
+        else:
+            message = "Study pack generated successfully"
+        return StudyPackResponse(
+            video_id=video_id,
+            language=request.language,
+            paragraph=pack["paragraph"],
+            bullets=pack["bullets"],
+            mcqs=pack["mcqs"],
+            descriptive_questions=pack["descriptive_questions"],
+            summary=f"{pack['paragraph']}\n\nKey Points:\n{bullet_text}",
+            questions=pack["questions"],
+            transcript_lines=len(transcript_data),
+            total_chunks=len(chunks),
+            chunks_used=pack["chunks_used"],
+            llm_calls=0 if cached else pack["llm_calls"],
+            cached=cached,
+            message=message
+        )
+    except HTTPException:
+        raise
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+class ChaptersRequest(BaseModel):
+    url: Optional[str] = None
+    video_id: Optional[str] = None
+    language: str = "en"
+
+    @model_validator(mode="after")
+    def validate_input(self):
+        if not self.url and not self.video_id:
+            raise ValueError("Either 'url' or 'video_id' must be provided")
+        return self
+
+
+class Chapter(BaseModel):
+    index: int
+    start_time: float
+    end_time: float
+    title: str
+    summary: str
+
+
+class ChaptersResponse(BaseModel):
+    video_id: str
+    language: str
+    chapters: list[Chapter]
+    message: str = "Chapters generated successfully"
+
+
+@app.post("/chapters", response_model=ChaptersResponse)
+async def video_chapters(request: ChaptersRequest):
+    """
+    Split a video into topical chapters and summarize each one. Chapter
+    summaries are cached individually and reused by /summarize with
+    selection='chapters'.
+    """
+    try:
+        video_id = request.video_id or extract_video_id(request.url)
+        transcript_data = await run_stage("fetch", load_transcript, video_id, request.language)
+        if not transcript_data:
+            raise HTTPException(
+                status_code=404,
+                detail=f"No transcript found for video '{video_id}' in language '{request.language}'"
+            )
+        chapters = await run_stage("chunk", load_chapters, video_id, request.language, transcript=transcript_data)
+        chapters = await summarize_chapters(video_id, request.language, chapters)
+        degraded = any(c.get("mode") == "extractive" for c in chapters)
+        return ChaptersResponse(
+            video_id=video_id,
+            language=request.language,
+            chapters=chapters,
+            message="Chapters generated with extractive summaries" if degraded else "Chapters generated successfully"
+        )
+    except HTTPException:
+        raise
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+class SearchHit(BaseModel):
+    video_id: str
+    start_time: float
+    end_time: float
+    score: float
+    text: str
+
+
+class SearchResponse(BaseModel):
+    query: str
+    total_hits: int
+    page: int
+    page_size: int
+    results: list[SearchHit]
+
+
+@app.get("/search", response_model=SearchResponse)
+async def search_corpus(
+    q: str = Query(..., min_length=1, description="Search query"),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(10, ge=1, le=100),
+    video_id: Optional[str] = Query(None, description="Restrict the search to one video")
+):
+    """
+    Search the chunks of every ingested video and return timestamped hits,
+    ranked by BM25. No LLM call is made.
+    """
+    try:
+        index = await run_stage("fetch", get_corpus_index)
+        found = await run_stage(
+            "retrieve",
+            index.search,
+            q,
+            limit=page_size,
+            offset=(page - 1) * page_size,
+            video_id=video_id
+        )
+        return SearchResponse(
+            query=q,
+            total_hits=found["total_hits"],
+            page=page,
+            page_size=page_size,
+            results=found["results"]
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error searching corpus: {str(e)}")
+
+
+class PrefetchRequest(BaseModel):
+    url: str = Field(..., description="YouTube playlist, channel or video URL")
+    language: str = "en"
+    summarize: bool = Field(False, description="Precompute the summary of every video")
+    questions: bool = Field(False, description="Precompute the question set of every video")
+    max_videos: int = Field(200, ge=1, le=1000)
+
+
+@app.post("/prefetch")
+def prefetch_videos(request: PrefetchRequest):
+    """
+    Pre-ingest every video of a playlist or channel in the background so
+    the user-facing endpoints serve warm transcripts, chunks and summaries.
+    """
+    try:
+        job = start_prefetch(
+            request.url,
+            language=request.language,
+            summarize=request.summarize,
+            questions=request.questions,
+            max_videos=request.max_videos
+        )
+        return {"job_id": job["job_id"], "status": job["status"]}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error starting prefetch: {str(e)}")
+
+
+@app.get("/prefetch/{job_id}")
+def prefetch_status(job_id: str):
+    job = get_prefetch_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown prefetch job '{job_id}'")
+    return job
+
+
+class LiveStartRequest(BaseModel):
+    url: Optional[str] = None
+    video_id: Optional[str] = None
+    language: str = "en"
+    poll_interval: float = Field(30.0, ge=5.0, le=600.0, description="Seconds between transcript polls")
+
+    @model_validator(mode="after")
+    def validate_input(self):
+        if not self.url and not self.video_id:
+            raise ValueError("Either 'url' or 'video_id' must be provided")
+        return self
+
+
+@app.post("/live/start")
+def live_start(request: LiveStartRequest):
+    """
+    Start incremental ingestion of a live stream. /chat answers from the
+    transcript ingested so far while the session runs.
+    """
+    try:
+        video_id = request.video_id or extract_video_id(request.url)
+        return start_live_session(video_id, request.language, request.poll_interval)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error starting live session: {str(e)}")
+
+
+@app.get("/live/{video_id}")
+def live_status(video_id: str, language: str = "en"):
+    status = live_session_status(video_id, language)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"No live session for '{video_id}'")
+    return status
+
+
+@app.post("/live/{video_id}/stop")
+async def live_stop(video_id: str, language: str = "en"):
+    """Finalize a live session and store its transcript and chunks."""
+    status = await run_stage("fetch", stop_live_session, video_id, language)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"No live session for '{video_id}'")
+    return status
+
+
 class EvaluateRequest(BaseModel):
     video_id: str = Field(
         ...,
@@ -377,9 +805,11 @@ class EvaluationResponse(BaseModel):
 async def evaluate_answers_endpoint(request: EvaluateRequest):
     try:
         # 1️⃣ Fetch transcript
-        transcript_data = fetch_youtube_transcript(
+        transcript_data = await run_stage(
+            "fetch",
+            load_transcript,
             request.video_id, 
-            language=request.language
+            request.language
         )
         if not transcript_data:
             raise HTTPException(
@@ -388,22 +818,20 @@ async def evaluate_answers_endpoint(request: EvaluateRequest):
             )
 
         # 2️⃣ Chunk transcript
-        chunks = chunk_transcript(transcript_data)
+        chunks = await run_stage(
+            "chunk", load_chunks, request.video_id, request.language, transcript=transcript_data
+        )
         if not chunks:
             raise HTTPException(status_code=500, detail="Transcript chunking failed")
 
-        # 3️⃣ Retrieve relevant chunks for question generation
-        retrieved_chunks = retrieve_top_k(
-            chunks=chunks,
-            query="Generate educational questions about this content",
-            k=5
+        # 3️⃣ Retrieve relevant chunks and 4️⃣ generate questions
+        # (reuses the question set served by /questions for this video)
+        questions, _ = await run_stage(
+            "generate", questions_for_video, request.video_id, request.language, chunks
         )
         
-        # 4️⃣ Generate questions
-        questions = generate_questions(retrieved_chunks)
-        
         # 5️⃣ Evaluate answers
-        evaluation = evaluate_answers(questions, request.user_answers)
+        evaluation = await run_stage("generate", evaluate_answers, questions, request.user_answers)
         
         try:
             # Try to parse the evaluation as JSON
@@ -0,0 +1,229 @@
+import asyncio
+import json
+import os
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field, model_validator
+
+from ingestion.pipeline import load_transcript, load_chunks, TranscriptNotFound
+from vectorestore.retriever import retrieve_top_k_batch
+from rag.llm import generate_text
+from rag.resilience import CircuitOpenError, DeadlineExceeded
+from scheduler.stages import run_stage
+from rag.chat import extract_video_id
+from reports.report import clean_json
+
+# Questions answered per packed LLM call
+BATCH_CHAT_GROUP_SIZE = int(os.getenv("BATCH_CHAT_GROUP_SIZE", "10"))
+
+# Attempts at a packed call before its questions are answered one by one
+BATCH_CHAT_PACKED_ATTEMPTS = int(os.getenv("BATCH_CHAT_PACKED_ATTEMPTS", "2"))
+
+# Single-question fallback calls one request may run at once
+BATCH_CHAT_SINGLE_CONCURRENCY = int(os.getenv("BATCH_CHAT_SINGLE_CONCURRENCY", "4"))
+
+
+class BatchChatRequest(BaseModel):
+    url: Optional[str] = None
+    video_id: Optional[str] = None
+    questions: List[str] = Field(..., min_length=1, max_length=50)
+    language: str = "en"
+    k: int = Field(5, ge=1, le=20, description="Chunks retrieved per question")
+
+    @model_validator(mode="after")
+    def validate_input(self):
+        if not self.url and not self.video_id:
+            raise ValueError("Either 'url' or 'video_id' must be provided")
+        self.questions = [q.strip() for q in self.questions]
+        if not all(self.questions):
+            raise ValueError("Questions must not be empty")
+        return self
+
+
+class ChunkReference(BaseModel):
+    chunk_index: int
+    start_time: float
+    end_time: float
+
+
+class BatchChatAnswer(BaseModel):
+    question: str
+    answer: str
+    chunks_used: List[ChunkReference]
+
+
+class BatchChatResponse(BaseModel):
+    video_id: str
+    answers: List[BatchChatAnswer]
+    retrieved_chunks_used: int
+    llm_calls: int
+    message: str = "Batch chat responses generated successfully"
+
+
+def _build_prompt(questions: List[str], chunk_ids: List[int], chunks: List[Dict]) -> str:
+    context = "\n\n".join(
+        f"[C{i}] ({chunks[i].get('start_time')} - {chunks[i].get('end_time')})\n{chunks[i].get('text', '')}"
+        for i in chunk_ids
+    )
+    numbered = "\n".join(f"Q{n}: {q}" for n, q in enumerate(questions, start=1))
+    return f"""Based on the following video transcript context, answer every question below.
+If an answer cannot be found in the context, answer "I cannot answer this based on the video content."
+
+Context:
+{context}
+
+Questions:
+{numbered}
+
+Respond ONLY with a JSON array, one object per question, in this format:
+[{{"id": 1, "answer": "...", "chunks": [0, 3]}}]
+where "chunks" lists the C numbers of the context passages the answer relies on.
+"""
+
+
+def _parse_answers(output: str) -> Dict[int, Dict]:
+    """Map question number to {'answer', 'chunks'}; malformed entries are skipped."""
+    try:
+        data = clean_json(output)
+    except (json.JSONDecodeError, TypeError):
+        return {}
+    if isinstance(data, dict):
+        data = data.get("answers", [])
+    if not isinstance(data, list):
+        return {}
+
+    parsed = {}
+    for item in data:
+        if not isinstance(item, dict) or "answer" not in item:
+            continue
+        try:
+            number = int(item.get("id"))
+        except (TypeError, ValueError):
+            continue
+        cited = []
+        for ref in item.get("chunks") or []:
+            try:
+                cited.append(int(str(ref).lstrip("Cc")))
+            except ValueError:
+                continue
+        parsed[number] = {"answer": str(item["answer"]).strip(), "chunks": cited}
+    return parsed
+
+
+async def _answer_single(question: str, chunk_ids: List[int], chunks: List[Dict]) -> str:
+    # Same prompt as /chat, used when a packed answer is missing
+    context = "\n".join(chunks[i].get("text", "") for i in chunk_ids)
+    prompt = f"""Based on the following video transcript context, answer the user's question.
+If the answer cannot be found in the context, say "I cannot answer this based on the video content."
+
+Context:
+{context}
+
+Question: {question}
+
+Answer:"""
+    return await run_stage("generate", generate_text, prompt, task="chat", hedge=True)
+
+
+async def chat_with_video_batch(request: BatchChatRequest) -> BatchChatResponse:
+    """
+    Answer many questions about one video.
+
+    The transcript is resolved and chunked once, retrieval runs for every
+    question in one pass, and questions are answered in concurrent packed
+    LLM calls of BATCH_CHAT_GROUP_SIZE questions that share their retrieved
+    context.
+    """
+    video_id = request.video_id or extract_video_id(request.url)
+    if not video_id:
+        raise ValueError("Invalid YouTube URL or video ID")
+
+    transcript_data = await run_stage("fetch", load_transcript, video_id, request.language)
+    if not transcript_data:
+        raise TranscriptNotFound(f"No transcript found for video '{video_id}' in language '{request.language}'")
+
+    chunks = await run_stage("chunk", load_chunks, video_id, request.language, transcript=transcript_data)
+    if not chunks:
+        raise ValueError("Transcript chunking failed")
+
+    retrieved = await run_stage("retrieve", retrieve_top_k_batch, chunks, request.questions, k=request.k)
+    single_limit = asyncio.Semaphore(BATCH_CHAT_SINGLE_CONCURRENCY)
+
+    async def answer_single(question: str, question_chunks: List[int]) -> str:
+        async with single_limit:
+            return await _answer_single(question, question_chunks, chunks)
+
+    async def answer_group(offset: int):
+        group = request.questions[offset:offset + BATCH_CHAT_GROUP_SIZE]
+        group_retrieved = retrieved[offset:offset + BATCH_CHAT_GROUP_SIZE]
+        chunk_ids = sorted({i for ids in group_retrieved for i in ids})
+        prompt = _build_prompt(group, chunk_ids, chunks)
+        calls = 0
+
+        # A failed or unparseable packed call is retried before falling
+        # back to one call per question
+        parsed = {}
+        while not parsed and calls < BATCH_CHAT_PACKED_ATTEMPTS:
+            calls += 1
+            try:
+                output = await run_stage("generate", generate_text, prompt, task="chat")
+                parsed = _parse_answers(output)
+            except (CircuitOpenError, DeadlineExceeded):
+                # Per-question retries would fail the same way
+                raise
+            except Exception as e:
+                print(f"Packed batch chat call failed (attempt {calls}): {e}")
+
+        # Questions the packed output missed are answered one by one,
+        # a few at a time
+        missing = [n for n in range(1, len(group) + 1) if n not in parsed]
+        singles = await asyncio.gather(*(
+            answer_single(group[n - 1], group_retrieved[n - 1]) for n in missing
+        ))
+        single_answers = dict(zip(missing, singles))
+        calls += len(missing)
+
+        results = []
+        for n, (question, question_chunks) in enumerate(zip(group, group_retrieved), start=1):
+            result = parsed.get(n)
+            if result is None:
+                answer = single_answers[n]
+                cited = question_chunks
+            else:
+                answer = result["answer"]
+                cited = [i for i in result["chunks"] if i in chunk_ids] or question_chunks
+            results.append((question, answer, cited))
+        return results, calls
+
+    # Packed calls for separate groups run concurrently
+    groups = await asyncio.gather(*(
+        answer_group(offset)
+        for offset in range(0, len(request.questions), BATCH_CHAT_GROUP_SIZE)
+    ))
+
+    answers: List[BatchChatAnswer] = []
+    used_chunks = set()
+    llm_calls = 0
+    for results, calls in groups:
+        llm_calls += calls
+        for question, answer, cited in results:
+            used_chunks.update(cited)
+            answers.append(BatchChatAnswer(
+                question=question,
+                answer=answer,
+                chunks_used=[
+                    ChunkReference(
+                        chunk_index=i,
+                        start_time=chunks[i]["start_time"],
+                        end_time=chunks[i]["end_time"]
+                    )
+                    for i in cited
+                ]
+            ))
+
+    return BatchChatResponse(
+        video_id=video_id,
+        answers=answers,
+        retrieved_chunks_used=len(used_chunks),
+        llm_calls=llm_calls
+    )
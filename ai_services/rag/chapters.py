@@ -0,0 +1,173 @@
+import asyncio
+import hashlib
+import os
+from typing import Dict, List, Union
+
+from rag.llm import generate_text
+from rag.extractive import extractive_summary
+from vectorestore.selection import select_coverage
+from ingestion.pipeline import artifact_key
+from store.artifact_store import get_store, SUMMARY
+from scheduler.stages import run_stage
+from reports.report import clean_json
+
+# Chapters longer than this are summarized from a coverage selection of
+# their text rather than the whole of it
+CHAPTER_MAX_WORDS = 3000
+CHAPTER_PASSAGE_WORDS = 150
+
+# Chapter summaries one request may have on the generate stage at once,
+# so a long video does not take every worker for itself
+CHAPTER_SUMMARY_CONCURRENCY = int(os.getenv("CHAPTER_SUMMARY_CONCURRENCY", "3"))
+
+
+def _fingerprint(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+def chapter_key(video_id: str, language: str, chapter: Dict) -> str:
+    """
+    Summary cache key of a chapter. Keys depend on the chapter's text, so
+    re-segmenting a transcript only invalidates chapters that changed.
+    """
+    return f"{artifact_key(video_id, language)}:chapter:{_fingerprint(chapter['text'])}"
+
+
+def _chapter_context(text: str) -> str:
+    words = text.split()
+    if len(words) <= CHAPTER_MAX_WORDS:
+        return text
+    passages = [
+        {
+            "text": " ".join(words[i:i + CHAPTER_PASSAGE_WORDS]),
+            "start_time": i,
+            "end_time": i + CHAPTER_PASSAGE_WORDS,
+        }
+        for i in range(0, len(words), CHAPTER_PASSAGE_WORDS)
+    ]
+    k = CHAPTER_MAX_WORDS // CHAPTER_PASSAGE_WORDS
+    return "\n".join(p["text"] for p in select_coverage(passages, k=k))
+
+
+def summarize_chapter(chapter: Dict) -> Dict[str, str]:
+    """
+    Title and 2-3 sentence summary of one chapter.
+
+    Falls back to an extractive summary (marked "mode": "extractive")
+    when every LLM provider fails.
+    """
+    prompt = f"""
+This is one section of a YouTube video transcript ({chapter['start_time']}s - {chapter['end_time']}s).
+Give the section a short title (at most 8 words) and summarize it in 2-3 sentences.
+Respond ONLY with JSON in this format:
+{{"title": "...", "summary": "..."}}
+Transcript:
+{_chapter_context(chapter['text'])}
+"""
+    try:
+        result = clean_json(generate_text(prompt, task="chapters"))
+        if not isinstance(result, dict) or not result.get("summary"):
+            raise ValueError("Chapter summary is missing")
+        return {
+            "title": str(result.get("title") or f"Chapter {chapter['index'] + 1}").strip(),
+            "summary": str(result["summary"]).strip(),
+        }
+    except Exception as e:
+        print(f"Error summarizing chapter {chapter['index']}, using extractive fallback: {str(e)}")
+        fallback = extractive_summary([chapter], max_bullets=1, paragraph_sentences=2)
+        return {
+            "title": f"Chapter {chapter['index'] + 1}",
+            "summary": fallback["paragraph"],
+            "mode": "extractive",
+        }
+
+
+def chapter_summary(video_id: str, language: str, chapter: Dict) -> Dict[str, str]:
+    """Cached summarize_chapter; degraded summaries are not cached."""
+    store = get_store()
+    key = chapter_key(video_id, language, chapter)
+    summary = store.get(SUMMARY, key)
+    if summary is None:
+        summary = summarize_chapter(chapter)
+        if summary.get("mode") != "extractive":
+            store.put(SUMMARY, key, summary, video_id=video_id)
+    return summary
+
+
+async def summarize_chapters(video_id: str, language: str, chapters: List[Dict]) -> List[Dict]:
+    """
+    Attach a title and summary to every chapter. Chapters missing from
+    the cache are summarized concurrently on the generate stage, at most
+    CHAPTER_SUMMARY_CONCURRENCY at a time.
+    """
+    limit = asyncio.Semaphore(CHAPTER_SUMMARY_CONCURRENCY)
+
+    async def summarize(chapter: Dict) -> Dict[str, str]:
+        async with limit:
+            return await run_stage("generate", chapter_summary, video_id, language, chapter)
+
+    summaries = await asyncio.gather(*(summarize(chapter) for chapter in chapters))
+    return [
+        {
+            "index": chapter["index"],
+            "start_time": chapter["start_time"],
+            "end_time": chapter["end_time"],
+            **summary,
+        }
+        for chapter, summary in zip(chapters, summaries)
+    ]
+
+
+def summary_from_chapters(
+    video_id: str,
+    language: str,
+    chapters: List[Dict]
+) -> Dict[str, Union[str, List[str]]]:
+    """
+    Whole-video summary ({'paragraph', 'bullets'}) built from chapter
+    summaries instead of the transcript, so it costs one short LLM call
+    and is reused until a chapter changes.
+
+    Args:
+        chapters: Output of summarize_chapters
+    """
+    outline = "\n".join(
+        f"{c['index'] + 1}. [{c['start_time']} - {c['end_time']}] {c['title']}: {c['summary']}"
+        for c in chapters
+    )
+    store = get_store()
+    key = f"{artifact_key(video_id, language)}:chapters:{_fingerprint(outline)}"
+    summary = store.get(SUMMARY, key)
+    if summary is not None:
+        return summary
+
+    prompt = f"""
+These are the chapters of a YouTube video with a summary of each.
+Respond ONLY with JSON in this format:
+{{"paragraph": "...", "bullets": ["...", "..."]}}
+where "paragraph" is a friendly, engaging 4-6 sentence summary of the whole video
+and "bullets" are 5-7 concise key points.
+Chapters:
+{outline}
+"""
+    try:
+        result = clean_json(generate_text(prompt, task="summary"))
+        if not isinstance(result, dict) or not result.get("paragraph"):
+            raise ValueError("Summary is missing")
+        bullets = result.get("bullets") or []
+        summary = {
+            "paragraph": str(result["paragraph"]).strip(),
+            "bullets": [str(b).strip("-•* ").strip() for b in bullets if str(b).strip()]
+            if isinstance(bullets, list) else [str(bullets)],
+        }
+    except Exception as e:
+        print(f"Error summarizing chapters, using chapter outline: {str(e)}")
+        return {
+            "paragraph": " ".join(c["summary"] for c in chapters),
+            "bullets": [f"{c['title']}: {c['summary']}" for c in chapters],
+            "mode": "extractive",
+        }
+
+    if not any(c.get("mode") == "extractive" for c in chapters):
+        store.put(SUMMARY, key, summary, video_id=video_id)
+    return summary
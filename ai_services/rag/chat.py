@@ -1,7 +1,11 @@
-from transcript_extracter.transcript import fetch_youtube_transcript
-from ingestion.chunker import chunk_transcript
+from ingestion.pipeline import load_transcript, load_chunks, TranscriptNotFound
+from ingestion.live import get_live_session
 from vectorestore.retriever import retrieve_top_k
-from rag.gemini_client import generate_text
+from rag.llm import generate_text
+from rag.extractive import extractive_answer
+from rag.faq_cache import faq_cache
+from rag.resilience import CircuitOpenError, DeadlineExceeded
+from scheduler.stages import run_stage
 from pydantic import BaseModel, model_validator
 from typing import Optional
 
@@ -23,14 +27,16 @@ class ChatResponse(BaseModel):
     answer: str
     retrieved_chunks_used: int
     message: str = "Chat response generated successfully"
+    cached: bool = False
+    cache_source: Optional[dict] = None
 
 async def chat_with_video(request: ChatRequest):
     try:
         # If no video is provided, use general AI chat
         if not request.video_id and not request.url:
-            # Use Gemini for general chat without video context
+            # Use the LLM for general chat without video context
             prompt = f"You are a helpful AI assistant. Answer the user's question: {request.question}"
-            answer = generate_text(prompt)
+            answer = await run_stage("generate", generate_text, prompt, task="chat", hedge=True)
             
             return ChatResponse(
                 video_id="general",
@@ -44,37 +50,80 @@ async def chat_with_video(request: ChatRequest):
         if not video_id:
             raise ValueError("Invalid YouTube URL or video ID")
 
+        # Live streams answer from what has been ingested so far; the FAQ
+        # cache is skipped because answers change as the stream grows
+        live = get_live_session(video_id, request.language)
+        if live is not None:
+            retrieved_chunks = await run_stage("retrieve", live.retrieve, request.question, 5)
+            context = "\n".join(chunk["text"] for chunk in retrieved_chunks)
+            if not context.strip():
+                return ChatResponse(
+                    video_id=video_id,
+                    question=request.question,
+                    answer="The live stream has no transcript yet. Please try again in a moment.",
+                    retrieved_chunks_used=0
+                )
+            prompt = f"""Based on the following transcript of a live stream that is still running, answer the user's question.
+If the answer cannot be found in the context, say "I cannot answer this based on the stream so far."
+
+Context:
+{context}
+
+Question: {request.question}
+
+Answer:"""
+            try:
+                answer = await run_stage("generate", generate_text, prompt, task="chat", hedge=True)
+            except Exception as e:
+                print(f"LLM call failed: {e}")
+                passages = await run_stage("retrieve", extractive_answer, request.question, retrieved_chunks)
+                answer = f"I'm having trouble generating a detailed response right now. The most relevant part of the stream says: {passages}"
+            return ChatResponse(
+                video_id=video_id,
+                question=request.question,
+                answer=answer,
+                retrieved_chunks_used=len(retrieved_chunks),
+                message="Chat response generated from the live stream so far"
+            )
+
+        # Serve near-duplicate questions from the per-video FAQ cache
+        match = await run_stage("fetch", faq_cache.lookup, video_id, request.language, request.question)
+        if match is not None:
+            entry = match["entry"]
+            return ChatResponse(
+                video_id=video_id,
+                question=request.question,
+                answer=entry["answer"],
+                retrieved_chunks_used=entry["retrieved_chunks_used"],
+                message="Answer served from the FAQ cache",
+                cached=True,
+                cache_source={
+                    "question": entry["question"],
+                    "similarity": match["similarity"],
+                    "answered_at": entry["created_at"],
+                }
+            )
+
         # Fetch transcript
-        transcript_data = fetch_youtube_transcript(video_id, language=request.language)
+        transcript_data = await run_stage("fetch", load_transcript, video_id, request.language)
         print(f"Fetched transcript data: {len(transcript_data) if transcript_data else 0} items")
         
-        # If transcript fails, use fallback mock data for this specific video
         if not transcript_data:
-            print("Using fallback transcript data due to YouTube blocking")
-            # Mock transcript for LNHBMFCzznE (Dr. Lara Boyd video about learning)
-            transcript_data = [
-                {"text": "So how do we learn? And why does some of us learn things more easily than others?", "start": 0, "duration": 5},
-                {"text": "So, as I just mentioned, I'm Dr. Lara Boyd. I am a brain researcher here at the University of British Columbia.", "start": 5, "duration": 6},
-                {"text": "And I'm going to talk to you today about learning. And the reason I'm so interested in learning is because I'm a teacher.", "start": 11, "duration": 5},
-                {"text": "I've been teaching for about 20 years. And I've seen thousands of students in my classes.", "start": 16, "duration": 4},
-                {"text": "And I've seen some students who learn really easily, and some students who really struggle.", "start": 20, "duration": 5},
-                {"text": "And I've always wondered, why is that? What makes some people learn more easily than others?", "start": 25, "duration": 5},
-                {"text": "And so what I've done is I've spent my career trying to understand how the brain learns.", "start": 30, "duration": 5},
-                {"text": "And what I've discovered is that learning is not a simple process. It's actually quite complicated.", "start": 35, "duration": 5},
-                {"text": "And there are many different factors that influence how we learn. And some of these factors are genetic.", "start": 40, "duration": 6},
-                {"text": "Some of them are environmental. And some of them are behavioral.", "start": 46, "duration": 4},
-                {"text": "And so what I'm going to do today is I'm going to talk to you about three things that influence learning.", "start": 50, "duration": 6},
-                {"text": "The first thing is genetics. The second thing is behavior. And the third thing is the environment.", "start": 56, "duration": 6}
-            ]
-
-        # Chunk transcript
-        chunks = chunk_transcript(transcript_data)
+            raise TranscriptNotFound(
+                f"No transcript found for video '{video_id}' in language '{request.language}'"
+            )
+
+        chunks = await run_stage(
+            "chunk", load_chunks, video_id, request.language, transcript=transcript_data
+        )
         print(f"Created {len(chunks)} chunks")
         if not chunks:
             raise ValueError("Transcript chunking failed")
 
         # Retrieve relevant chunks for the question
-        retrieved_chunks = retrieve_top_k(
+        retrieved_chunks = await run_stage(
+            "retrieve",
+            retrieve_top_k,
             chunks=chunks,
             query=request.question,
             k=5
@@ -96,7 +145,7 @@ async def chat_with_video(request: ChatRequest):
                 retrieved_chunks_used=0
             )
         
-        # Use Gemini for RAG response
+        # Use the LLM for RAG response
         prompt = f"""Based on the following video transcript context, answer the user's question. 
 If the answer cannot be found in the context, say "I cannot answer this based on the video content."
 
@@ -108,14 +157,20 @@ Question: {request.question}
 Answer:"""
         
         try:
-            answer = generate_text(prompt)
+            answer = await run_stage("generate", generate_text, prompt, task="chat", hedge=True)
+            await run_stage(
+                "fetch", faq_cache.add,
+                video_id, request.language, request.question, answer, len(retrieved_chunks)
+            )
         except Exception as e:
-            print(f"Gemini API failed: {e}")
-            # Fallback response when API fails
-            if "who" in request.question.lower() or "what" in request.question.lower():
-                answer = f"Based on the video transcript, this appears to be a talk by Dr. Lara Boyd about how we learn and why some people learn more easily than others. The video discusses brain research and learning processes."
+            print(f"LLM call failed: {e}")
+            # Fallback response when API fails: quote the transcript
+            # sentences closest to the question
+            passages = await run_stage("retrieve", extractive_answer, request.question, retrieved_chunks)
+            if passages:
+                answer = f"I'm having trouble generating a detailed response right now. The most relevant part of the video says: {passages}"
             else:
-                answer = "I found relevant information from the video transcript, but I'm having trouble generating a detailed response right now. The video appears to be about learning and brain research by Dr. Lara Boyd."
+                answer = "I'm having trouble generating a detailed response right now. Please try again later."
 
         return ChatResponse(
             video_id=video_id,
@@ -124,6 +179,8 @@ Answer:"""
             retrieved_chunks_used=len(retrieved_chunks)
         )
 
+    except (TranscriptNotFound, DeadlineExceeded, CircuitOpenError):
+        raise
     except Exception as e:
         raise ValueError(f"Error in chat: {str(e)}")
 
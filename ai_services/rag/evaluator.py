@@ -1,4 +1,4 @@
-from rag.gemini_client import generate_text
+from rag.llm import generate_text
 
 
 def evaluate_answers(questions: str, user_answers: dict):
@@ -34,5 +34,5 @@ Respond in JSON format with keys:
 score, correct, incorrect, weak_areas, understanding_level
 """
 
-    output = generate_text(prompt)
+    output = generate_text(prompt, task="evaluation")
     return output
\ No newline at end of file
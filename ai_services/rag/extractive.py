@@ -0,0 +1,97 @@
+import re
+from typing import Dict, List, Union
+
+import numpy as np
+
+from vectorestore.selection import term_matrix
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+# Auto-generated captions often have no punctuation; long runs are cut
+# into pseudo-sentences of this many words
+PSEUDO_SENTENCE_WORDS = 25
+
+# Above this many sentences the O(n^2) TextRank graph is replaced by
+# centroid scoring, which is linear in the number of sentences
+TEXTRANK_MAX_SENTENCES = 1500
+
+
+def split_sentences(text: str) -> List[str]:
+    sentences = []
+    for sentence in _SENTENCE_RE.split(text):
+        words = sentence.split()
+        step = len(words) if len(words) <= PSEUDO_SENTENCE_WORDS * 2 else PSEUDO_SENTENCE_WORDS
+        for start in range(0, len(words), max(step, 1)):
+            piece = words[start:start + step]
+            if len(piece) >= 4:
+                sentences.append(" ".join(piece))
+    return sentences
+
+
+def _textrank(vectors: np.ndarray, damping: float = 0.85, iterations: int = 50) -> np.ndarray:
+    similarity = vectors @ vectors.T
+    np.fill_diagonal(similarity, 0.0)
+    row_sums = similarity.sum(axis=1, keepdims=True)
+    transition = similarity / np.where(row_sums == 0, 1.0, row_sums)
+
+    n = len(vectors)
+    scores = np.full(n, 1.0 / n, dtype=np.float32)
+    for _ in range(iterations):
+        updated = (1 - damping) / n + damping * (transition.T @ scores)
+        if np.abs(updated - scores).sum() < 1e-6:
+            return updated
+        scores = updated
+    return scores
+
+
+def _centroid(vectors: np.ndarray) -> np.ndarray:
+    centroid = vectors.mean(axis=0)
+    norm = np.linalg.norm(centroid)
+    return vectors @ (centroid / norm) if norm else np.zeros(len(vectors), dtype=np.float32)
+
+
+def rank_sentences(sentences: List[str]) -> np.ndarray:
+    """Score sentences by TextRank, or by centroid similarity for very long inputs."""
+    vectors = term_matrix(sentences)
+    if len(sentences) > TEXTRANK_MAX_SENTENCES:
+        return _centroid(vectors)
+    return _textrank(vectors)
+
+
+def extractive_summary(chunks: List[Dict], max_bullets: int = 7, paragraph_sentences: int = 4) -> Dict[str, Union[str, List[str]]]:
+    """
+    Summarize transcript chunks in-process without calling an LLM.
+
+    Returns the same {'paragraph', 'bullets'} shape as generate_summary,
+    built from the highest ranked transcript sentences kept in timeline order.
+    """
+    text = " ".join(c.get("text", "") for c in chunks if isinstance(c, dict))
+    sentences = split_sentences(text)
+    if not sentences:
+        return {
+            "paragraph": "No content available to summarize.",
+            "bullets": ["No content available"]
+        }
+
+    scores = rank_sentences(sentences)
+    ranked = np.argsort(-scores)
+    bullets = [sentences[i] for i in sorted(ranked[:max_bullets])]
+    paragraph = " ".join(sentences[i] for i in sorted(ranked[:paragraph_sentences]))
+
+    return {
+        "paragraph": paragraph,
+        "bullets": bullets
+    }
+
+
+def extractive_answer(question: str, chunks: List[Dict], max_sentences: int = 3) -> str:
+    """Return the transcript sentences most similar to a question, in timeline order."""
+    text = " ".join(c.get("text", "") for c in chunks if isinstance(c, dict))
+    sentences = split_sentences(text)
+    if not sentences:
+        return ""
+
+    vectors = term_matrix(sentences + [question])
+    scores = vectors[:-1] @ vectors[-1]
+    ranked = np.argsort(-scores)[:max_sentences]
+    return " ".join(sentences[i] for i in sorted(ranked))
@@ -0,0 +1,230 @@
+import os
+import re
+import threading
+import time
+import zlib
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+
+from store.artifact_store import get_store
+
+FAQ = "faq"
+
+# Minimum shingle Jaccard similarity for two questions to share an answer
+# (their key terms must match as well, see key_terms)
+FAQ_SIMILARITY_THRESHOLD = float(os.getenv("FAQ_SIMILARITY_THRESHOLD", "0.85"))
+
+# Most recent entries kept per video
+FAQ_MAX_ENTRIES = int(os.getenv("FAQ_MAX_ENTRIES", "200"))
+
+# Seconds before a worker reloads a video's entries written by other workers
+FAQ_REFRESH_INTERVAL = 30.0
+
+# MinHash signature = BANDS x ROWS hash values; two questions become LSH
+# candidates when any band matches
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+
+# Coefficients stay below 2^31 so a * crc32 + b cannot overflow uint64
+_PRIME = (1 << 32) - 5
+_rng = np.random.default_rng(1234)
+_A = _rng.integers(1, 1 << 31, NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, 1 << 31, NUM_PERM, dtype=np.uint64)
+
+_CONTRACTIONS = [
+    (r"\bwhat'?s\b", "what is"),
+    (r"\bwho'?s\b", "who is"),
+    (r"\bhow'?s\b", "how is"),
+    (r"\bwhere'?s\b", "where is"),
+    (r"\bwhy'?s\b", "why is"),
+    (r"\bwhen'?s\b", "when is"),
+    (r"\b(do|does|did|is|are|was|were|ca|could|would|should|wo|has|have)n'?t\b", r"\1 not"),
+]
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, expand common contractions and strip punctuation."""
+    text = question.lower().replace("’", "'")
+    for pattern, replacement in _CONTRACTIONS:
+        text = re.sub(pattern, replacement, text)
+    text = re.sub(r"[^a-z0-9\s]", " ", text)
+    return " ".join(text.split())
+
+
+# Words that do not change what a question asks. Negations ("not", "no",
+# "never", ...) are deliberately missing: they flip the meaning.
+_STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "be", "been", "am", "do", "does", "did",
+    "what", "which", "who", "whom", "whose", "how", "why", "when", "where",
+    "of", "in", "on", "at", "to", "for", "by", "with", "from", "about", "as", "into",
+    "and", "or", "this", "that", "these", "those", "it", "its", "there", "their",
+    "i", "me", "my", "you", "your", "we", "our", "he", "she", "they", "them", "his", "her",
+    "can", "could", "would", "should", "will", "may", "might", "must", "shall",
+    "has", "have", "had", "please", "tell", "explain", "video", "speaker", "say", "says", "said",
+}
+
+
+def key_terms(normalized: str) -> tuple:
+    """
+    Content words, numbers and negations of a question, in order, with a
+    crude plural strip. Two questions may only share an answer when these
+    are identical: shingle similarity alone matches "minute 10" with
+    "minute 20", a question with its negation, or swapped entities.
+    """
+    terms = []
+    for word in normalized.split():
+        if word in _STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        terms.append(word)
+    return tuple(terms)
+
+
+def shingles(normalized: str) -> Set[str]:
+    """Character shingles of each word (padded) plus word bigrams."""
+    words = normalized.split()
+    grams = set()
+    for word in words:
+        padded = f" {word} "
+        grams.update(padded[i:i + SHINGLE_SIZE] for i in range(max(len(padded) - SHINGLE_SIZE + 1, 1)))
+    grams.update(f"{a}_{b}" for a, b in zip(words, words[1:]))
+    return grams
+
+
+def minhash(grams: Set[str]) -> np.ndarray:
+    hashes = np.array([zlib.crc32(g.encode("utf-8")) for g in grams] or [0], dtype=np.uint64)
+    # (a * x + b) mod p for every permutation and shingle at once
+    permuted = (np.outer(_A, hashes) + _B[:, None]) % _PRIME
+    return permuted.min(axis=1)
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+class VideoFaq:
+    """Cached answers for one video, with an LSH index over their questions."""
+
+    def __init__(self, entries: List[Dict]):
+        self.entries: List[Dict] = []
+        self._grams: List[Set[str]] = []
+        self._terms: List[tuple] = []
+        self._buckets: Dict[tuple, List[int]] = defaultdict(list)
+        self.loaded_at = time.time()
+        for entry in entries:
+            self._index(entry)
+
+    def _index(self, entry: Dict) -> None:
+        position = len(self.entries)
+        grams = shingles(entry["normalized"])
+        signature = minhash(grams)
+        self.entries.append(entry)
+        self._grams.append(grams)
+        self._terms.append(key_terms(entry["normalized"]))
+        for band in range(BANDS):
+            key = (band, signature[band * ROWS:(band + 1) * ROWS].tobytes())
+            self._buckets[key].append(position)
+
+    def lookup(self, normalized: str, threshold: float) -> Optional[Dict]:
+        grams = shingles(normalized)
+        signature = minhash(grams)
+        candidates = set()
+        for band in range(BANDS):
+            key = (band, signature[band * ROWS:(band + 1) * ROWS].tobytes())
+            candidates.update(self._buckets.get(key, ()))
+
+        terms = key_terms(normalized)
+        best, best_score = None, threshold
+        for position in candidates:
+            if self._terms[position] != terms:
+                continue
+            score = jaccard(grams, self._grams[position])
+            if score >= best_score:
+                best, best_score = self.entries[position], score
+        if best is None:
+            return None
+        return {"entry": best, "similarity": round(best_score, 3)}
+
+
+class FaqCache:
+    """
+    Per-video answer cache in front of chat_with_video.
+
+    Questions are normalised and matched against earlier questions about
+    the same video with MinHash/LSH; candidates are confirmed with exact
+    shingle Jaccard similarity against FAQ_SIMILARITY_THRESHOLD and must
+    have the same key terms. Entries are persisted in the artifact store
+    and shared by all workers, at most FAQ_MAX_ENTRIES per video.
+    """
+
+    def __init__(self, threshold: float = FAQ_SIMILARITY_THRESHOLD):
+        self.threshold = threshold
+        self._videos: Dict[str, VideoFaq] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._video_hits: Dict[str, int] = defaultdict(int)
+
+    def _video(self, key: str) -> VideoFaq:
+        with self._lock:
+            faq = self._videos.get(key)
+        if faq is None or time.time() - faq.loaded_at > FAQ_REFRESH_INTERVAL:
+            # Load outside the lock; a concurrent reload of the same video is harmless
+            faq = VideoFaq(get_store().get(FAQ, key) or [])
+            with self._lock:
+                self._videos[key] = faq
+        return faq
+
+    def lookup(self, video_id: str, language: str, question: str) -> Optional[Dict]:
+        """Return {'entry', 'similarity'} for a near-duplicate question, or None."""
+        key = f"{video_id}:{language}"
+        normalized = normalize_question(question)
+        match = self._video(key).lookup(normalized, self.threshold) if normalized else None
+        with self._lock:
+            if match is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._video_hits[video_id] += 1
+        return match
+
+    def add(self, video_id: str, language: str, question: str, answer: str, retrieved_chunks_used: int) -> None:
+        normalized = normalize_question(question)
+        if not normalized:
+            return
+        entry = {
+            "question": question,
+            "normalized": normalized,
+            "answer": answer,
+            "retrieved_chunks_used": retrieved_chunks_used,
+            "created_at": time.time(),
+        }
+        key = f"{video_id}:{language}"
+        # Appended inside one store transaction, so entries added by other
+        # workers at the same time are kept
+        entries = get_store().update(
+            FAQ, key, lambda current: ((current or []) + [entry])[-FAQ_MAX_ENTRIES:], video_id=video_id
+        )
+        faq = VideoFaq(entries)
+        with self._lock:
+            self._videos[key] = faq
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "videos_loaded": len(self._videos),
+                "top_videos": sorted(self._video_hits.items(), key=lambda item: -item[1])[:10],
+            }
+
+
+faq_cache = FaqCache()
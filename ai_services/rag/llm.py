@@ -0,0 +1,388 @@
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+
+from rag import gemini_client, openai_client
+from rag.extractive import extractive_summary
+from rag.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    DeadlineExceeded,
+    LatencyTracker,
+    check_deadline,
+    hedged_call,
+    remaining_time,
+)
+from scheduler.admission import PriorityGate, gemini_gate, openai_gate
+from scheduler.profiling import span
+
+# Per-attempt HTTP timeout; shortened to whatever is left of the request deadline
+REQUEST_TIMEOUT = float(os.getenv("LLM_TIMEOUT", os.getenv("GEMINI_TIMEOUT", "30")))
+
+# Task -> model size tier. Override one with LLM_TIER_<TASK>=small|large
+TASK_TIERS = {
+    "chat": "small",
+    "bullets": "small",
+    "summary": "small",
+    "chapters": "small",
+    "questions": "small",
+    "study_pack": "small",
+    "evaluation": "large",
+    "default": "small",
+}
+
+# Remote providers in order of preference when no latency is known yet
+LLM_PROVIDERS = [p.strip() for p in os.getenv("LLM_PROVIDERS", "gemini,openai").split(",") if p.strip()]
+
+# Share of calls sent to a healthy provider other than the fastest, so
+# latency estimates of the others stay current
+ROUTER_EXPLORE = float(os.getenv("LLM_ROUTER_EXPLORE", "0.05"))
+
+# A provider failing more than this share of calls in the last
+# HEALTH_WINDOW seconds is only tried after the healthy ones
+MAX_ERROR_RATE = 0.5
+HEALTH_WINDOW = 300.0
+
+
+def task_tier(task: str) -> str:
+    tier = os.getenv(f"LLM_TIER_{task.upper()}") or TASK_TIERS.get(task, TASK_TIERS["default"])
+    return tier if tier in ("small", "large") else "small"
+
+
+class LLMProvider:
+    """
+    One LLM backend. Tracks its own rolling latency and error rate, which
+    the router uses to pick a provider per call.
+    """
+
+    name = "provider"
+
+    def __init__(self, models: Dict[str, str], breaker: CircuitBreaker, latency: LatencyTracker):
+        self.models = models
+        self.breaker = breaker
+        self.latency = latency
+        self._outcomes = deque()
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        return True
+
+    def generate(self, prompt: str, model: str, hedge: bool = False) -> str:
+        raise NotImplementedError
+
+    def record(self, success: bool) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._outcomes.append((now, success))
+            while self._outcomes and now - self._outcomes[0][0] > HEALTH_WINDOW:
+                self._outcomes.popleft()
+
+    def error_rate(self) -> float:
+        with self._lock:
+            if not self._outcomes:
+                return 0.0
+            return sum(1 for _, ok in self._outcomes if not ok) / len(self._outcomes)
+
+    def healthy(self) -> bool:
+        return self.breaker.state != "open" and self.error_rate() <= MAX_ERROR_RATE
+
+    def typical_latency(self) -> Optional[float]:
+        return self.latency.percentile(0.5, min_samples=1)
+
+    def metrics(self) -> Dict:
+        latency = self.typical_latency()
+        return {
+            "available": self.available(),
+            "healthy": self.healthy(),
+            "models": self.models,
+            "p50_latency_s": round(latency, 3) if latency is not None else None,
+            "error_rate": round(self.error_rate(), 3),
+            "circuit": self.breaker.snapshot(),
+        }
+
+
+class HttpProvider(LLMProvider):
+    """
+    An LLM reached over HTTP, described by a client module's
+    build_request/parse_response pair.
+
+    Retries and backoff never exceed the remaining request deadline, calls
+    fail fast while the circuit breaker is open, and with hedge=True a
+    duplicate request is sent once the first one is slower than the
+    provider's current p95 latency (for interactive calls).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        api_key: Optional[str],
+        models: Dict[str, str],
+        build_request: Callable[[str, str], Tuple[str, Dict, Dict]],
+        parse_response: Callable[[Dict], str],
+        breaker: CircuitBreaker,
+        latency: LatencyTracker,
+        gate: PriorityGate
+    ):
+        super().__init__(models, breaker, latency)
+        self.name = name
+        self.api_key = api_key
+        self.build_request = build_request
+        self.parse_response = parse_response
+        self.gate = gate
+
+    def available(self) -> bool:
+        return bool(self.api_key)
+
+    def _post(self, url: str, headers: Dict, payload: Dict, timeout: float) -> requests.Response:
+        """
+        One HTTP attempt, feeding the circuit breaker and latency window.
+
+        Waits for a slot of the provider's worker-wide concurrency limit
+        first; slots go to interactive requests before batch and
+        background work. The circuit breaker is only consulted once the
+        slot is held, so a half-open trial is always followed by a
+        recorded outcome.
+        """
+        # llm.request minus llm.http is the time spent waiting for a slot
+        with span("llm.request", provider=self.name, timeout=round(timeout, 2)):
+            with self.gate.slot():
+                self.breaker.allow()
+                with span("llm.http", provider=self.name):
+                    return self._post_now(url, headers, payload, timeout)
+
+    def _post_now(self, url: str, headers: Dict, payload: Dict, timeout: float) -> requests.Response:
+        started = time.monotonic()
+        try:
+            response = requests.post(url, headers=headers, json=payload, timeout=timeout)
+        except Exception:
+            self.breaker.record(False)
+            raise
+
+        # Client errors say nothing about the provider's health
+        self.breaker.record(response.status_code != 429 and response.status_code < 500)
+        if response.ok:
+            self.latency.add(time.monotonic() - started)
+        response.raise_for_status()
+        return response
+
+    def generate(self, prompt: str, model: str, hedge: bool = False) -> str:
+        url, headers, payload = self.build_request(prompt, model)
+
+        # Retry logic for rate limiting
+        max_retries = 3
+        for attempt in range(max_retries):
+            check_deadline(f"{self.name} call")
+            if self.breaker.state == "open":
+                # Fail fast without queueing for a slot
+                raise CircuitOpenError(
+                    f"{self.breaker.name} circuit is open, failing fast",
+                    retry_after=self.breaker.retry_after()
+                )
+            remaining = remaining_time()
+            timeout = REQUEST_TIMEOUT if remaining is None else min(REQUEST_TIMEOUT, remaining)
+
+            try:
+                if hedge:
+                    response = hedged_call(
+                        lambda: self._post(url, headers, payload, timeout),
+                        self.latency.percentile(0.95)
+                    )
+                else:
+                    response = self._post(url, headers, payload, timeout)
+                return self.parse_response(response.json())
+
+            except requests.exceptions.HTTPError as e:
+                if e.response.status_code == 429 and attempt < max_retries - 1:
+                    # Rate limited - wait and retry, unless the wait would blow the deadline
+                    wait_time = 2 ** attempt  # Exponential backoff: 1s, 2s
+                    remaining = remaining_time()
+                    if remaining is not None and wait_time >= remaining:
+                        raise DeadlineExceeded(f"Request deadline exceeded while rate limited by {self.name}")
+                    print(f"Rate limited by {self.name}. Waiting {wait_time} seconds before retry...")
+                    time.sleep(wait_time)
+                    continue
+                else:
+                    # Other HTTP error or max retries reached
+                    error_msg = f"{self.name} API error: {e}"
+                    if e.response.status_code == 400:
+                        try:
+                            error_data = e.response.json()
+                            error_msg += f" - {error_data}"
+                        except ValueError:
+                            pass
+                    raise RuntimeError(error_msg)
+            except (CircuitOpenError, DeadlineExceeded):
+                raise
+            except Exception as e:
+                if attempt < max_retries - 1:
+                    continue
+                raise RuntimeError(f"Error calling {self.name}: {str(e)}")
+
+        raise RuntimeError(f"Max retries exceeded for {self.name} API")
+
+
+# Lines introducing the source text in the rag prompts, and the first
+# lines after it that belong to the instructions again
+_CONTEXT_HEADER_RE = re.compile(r"^(?:transcript|context|key points to include):\s*$", re.IGNORECASE | re.MULTILINE)
+_CONTEXT_END_RE = re.compile(r"^(?:questions?|answer|respond|format)\b.*$", re.IGNORECASE | re.MULTILINE)
+
+
+def _prompt_context(prompt: str) -> str:
+    """Source text of a prompt, without the instructions around it."""
+    headers = list(_CONTEXT_HEADER_RE.finditer(prompt))
+    if not headers:
+        return prompt
+    context = prompt[headers[-1].end():]
+    end = _CONTEXT_END_RE.search(context)
+    return context[:end.start()] if end else context
+
+
+class LocalProvider(LLMProvider):
+    """
+    Offline stub for development without API keys: answers with the most
+    central sentences of the prompt's source text. Opt-in only, by listing
+    "local" in LLM_PROVIDERS; its output is not a real generation and
+    should not be mixed into a store that a real provider later serves.
+    """
+
+    name = "local"
+
+    def __init__(self):
+        super().__init__(
+            {"small": "extractive", "large": "extractive"},
+            CircuitBreaker("Local LLM stub"),
+            LatencyTracker()
+        )
+
+    def generate(self, prompt: str, model: str, hedge: bool = False) -> str:
+        started = time.monotonic()
+        summary = extractive_summary([{"text": _prompt_context(prompt)}], max_bullets=3, paragraph_sentences=3)
+        self.latency.add(time.monotonic() - started)
+        return summary["paragraph"]
+
+
+def _remote_provider(name: str) -> LLMProvider:
+    if name == "gemini":
+        return HttpProvider(
+            "gemini",
+            gemini_client.GEMINI_API_KEY,
+            gemini_client.GEMINI_MODELS,
+            gemini_client.build_request,
+            gemini_client.parse_response,
+            gemini_client.gemini_breaker,
+            gemini_client.gemini_latency,
+            gemini_gate
+        )
+    if name == "openai":
+        return HttpProvider(
+            "openai",
+            openai_client.OPENAI_API_KEY,
+            openai_client.OPENAI_MODELS,
+            openai_client.build_request,
+            openai_client.parse_response,
+            openai_client.openai_breaker,
+            openai_client.openai_latency,
+            openai_gate
+        )
+    raise ValueError(f"Unknown LLM provider '{name}'")
+
+
+class LLMRouter:
+    """
+    Send each call to the fastest healthy provider, failing over to the
+    others in turn.
+
+    Providers are ranked by their rolling median latency; untried
+    providers go first so they get measured, and unhealthy ones (open
+    circuit or error rate above MAX_ERROR_RATE) go last. A small share of
+    calls explores a healthy provider other than the fastest.
+    """
+
+    def __init__(self, providers: List[LLMProvider], fallback: Optional[LLMProvider] = None):
+        self.providers = providers
+        self.fallback = fallback
+        self.calls: Dict[str, int] = {p.name: 0 for p in providers + ([fallback] if fallback else [])}
+        self.failovers = 0
+
+    def ranked(self) -> List[LLMProvider]:
+        available = [p for p in self.providers if p.available()]
+        if not available:
+            return [self.fallback] if self.fallback else []
+
+        healthy = [p for p in available if p.healthy()]
+        unhealthy = [p for p in available if not p.healthy()]
+        # Stable sort keeps LLM_PROVIDERS order among equal latencies
+        healthy.sort(key=lambda p: p.typical_latency() or 0.0)
+        if len(healthy) > 1 and random.random() < ROUTER_EXPLORE:
+            healthy.insert(0, healthy.pop(random.randrange(1, len(healthy))))
+        return healthy + unhealthy
+
+    def generate(self, prompt: str, task: str = "default", hedge: bool = False) -> str:
+        tier = task_tier(task)
+        candidates = self.ranked()
+        if not candidates:
+            raise RuntimeError("No LLM provider is configured. Set GEMINI_API_KEY or OPENAI_API_KEY, or LLM_PROVIDERS=local for the offline stub")
+
+        errors: List[Exception] = []
+        for provider in candidates:
+            self.calls[provider.name] += 1
+            try:
+                text = provider.generate(prompt, provider.models[tier], hedge=hedge)
+                provider.record(True)
+                return text
+            except DeadlineExceeded:
+                raise
+            except CircuitOpenError as e:
+                errors.append(e)
+            except Exception as e:
+                provider.record(False)
+                errors.append(e)
+                print(f"LLM provider {provider.name} failed for task '{task}': {e}")
+            self.failovers += 1
+
+        if all(isinstance(e, CircuitOpenError) for e in errors):
+            raise CircuitOpenError(
+                "Every LLM provider circuit is open, failing fast",
+                retry_after=min(e.retry_after for e in errors)
+            )
+        raise RuntimeError(f"All LLM providers failed: {errors[-1]}")
+
+    def metrics(self) -> Dict:
+        providers = self.providers + ([self.fallback] if self.fallback else [])
+        return {
+            "providers": {p.name: p.metrics() for p in providers},
+            "order": [p.name for p in self.ranked()],
+            "task_tiers": {task: task_tier(task) for task in TASK_TIERS},
+            "calls": dict(self.calls),
+            "failovers": self.failovers,
+        }
+
+
+# The local stub is only used when listed, and only while no remote
+# provider has a key
+llm_router = LLMRouter(
+    [_remote_provider(name) for name in LLM_PROVIDERS if name != "local"],
+    fallback=LocalProvider() if "local" in LLM_PROVIDERS else None
+)
+
+
+def generate_text(prompt: str, task: str = "default", hedge: bool = False) -> str:
+    """
+    Generate text with the fastest healthy LLM provider.
+
+    Args:
+        prompt: Full prompt text
+        task: Task name from TASK_TIERS, selects the model size
+        hedge: Send a duplicate request when the first is slower than p95
+    """
+    return llm_router.generate(prompt, task=task, hedge=hedge)
+
+
+def llm_metrics() -> Dict:
+    return llm_router.metrics()
@@ -0,0 +1,46 @@
+import os
+from typing import Dict, Tuple
+
+from dotenv import load_dotenv
+
+from rag.resilience import CircuitBreaker, LatencyTracker
+
+load_dotenv()
+
+# Optional: without a key the OpenAI provider is skipped by the LLM router
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+
+OPENAI_URL = os.getenv("OPENAI_URL", "https://api.openai.com/v1/chat/completions")
+
+# Model per size tier, see rag.llm.TASK_TIERS
+OPENAI_MODELS = {
+    "small": os.getenv("OPENAI_MODEL_SMALL", "gpt-4o-mini"),
+    "large": os.getenv("OPENAI_MODEL_LARGE", "gpt-4o"),
+}
+
+openai_breaker = CircuitBreaker("OpenAI")
+openai_latency = LatencyTracker()
+
+
+def build_request(prompt: str, model: str) -> Tuple[str, Dict, Dict]:
+    """Return (url, headers, payload) of a chat completions call."""
+    payload = {
+        "model": model,
+        "messages": [
+            {"role": "user", "content": str(prompt)}
+        ]
+    }
+    return (
+        OPENAI_URL,
+        {"Content-Type": "application/json", "Authorization": f"Bearer {OPENAI_API_KEY}"},
+        payload,
+    )
+
+
+def parse_response(response_data: Dict) -> str:
+    choices = response_data.get("choices") or []
+    if choices:
+        content = (choices[0].get("message") or {}).get("content")
+        if content:
+            return content
+    return "No content generated"
@@ -1,5 +1,9 @@
 from transcript_extracter.transcript import fetch_youtube_transcript, extract_video_id
-from rag.gemini_client import generate_text
+from rag.llm import generate_text
+from vectorestore.selection import select_chunks
+from ingestion.pipeline import artifact_key
+from store.artifact_store import get_store, QUESTIONS
+
 def generate_questions(retrieved_chunks: list) -> str:
     """
     Generate questions from transcript chunks.
@@ -36,5 +40,31 @@ MCQs:
 Descriptive Questions:
 1. [Question]
 """
-    output = generate_text(prompt)
-    return output
\ No newline at end of file
+    output = generate_text(prompt, task="questions")
+    return output
+
+
+def questions_for_video(video_id: str, language: str, chunks: list, selection: str = "coverage"):
+    """
+    Return (questions, retrieved_chunks) for a video.
+
+    Generated question sets are kept in the artifact store so /questions
+    and /evaluate see the same questions on every worker.
+
+    Args:
+        selection: 'coverage' (chunks spread over the timeline) or 'query'
+    """
+    retrieved_chunks = select_chunks(
+        chunks,
+        query="Generate educational questions about this content",
+        k=5,
+        selection=selection
+    )
+
+    store = get_store()
+    key = f"{artifact_key(video_id, language)}:{selection}"
+    questions = store.get(QUESTIONS, key)
+    if questions is None:
+        questions = generate_questions(retrieved_chunks)
+        store.put(QUESTIONS, key, questions, video_id=video_id)
+    return questions, retrieved_chunks
@@ -0,0 +1,208 @@
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class DeadlineExceeded(RuntimeError):
+    """The request ran out of its time budget."""
+
+
+class CircuitOpenError(RuntimeError):
+    """The upstream service is failing and calls are being rejected fast."""
+
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        # Seconds until the circuit lets a trial call through again
+        self.retry_after = retry_after
+
+
+# -------------------------
+# Deadlines
+# -------------------------
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("deadline", default=None)
+
+
+@contextmanager
+def request_deadline(seconds: Optional[float]):
+    """
+    Give everything run inside the block a shared time budget.
+
+    The deadline lives in a context variable, so it follows the request
+    into threadpool workers and never outlives it. A nested deadline can
+    only shorten the budget, never extend it.
+    """
+    if seconds is None:
+        yield
+        return
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time() -> Optional[float]:
+    """Seconds left in the current request's budget, or None if unbounded."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def check_deadline(stage: str = "") -> None:
+    remaining = remaining_time()
+    if remaining is not None and remaining <= 0:
+        raise DeadlineExceeded(f"Request deadline exceeded{f' during {stage}' if stage else ''}")
+
+
+# -------------------------
+# Circuit breaker
+# -------------------------
+
+class CircuitBreaker:
+    """
+    Fail fast while an upstream error rate is high.
+
+    Outcomes of the last `window` seconds are tracked. Once at least
+    `min_calls` were made and the error rate reaches `failure_threshold`,
+    the circuit opens and calls are rejected for `cooldown` seconds. After
+    that, a single trial call is let through (half-open); its outcome
+    closes or re-opens the circuit.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: float = 0.5,
+        min_calls: int = 5,
+        window: float = 30.0,
+        cooldown: float = 15.0
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.min_calls = min_calls
+        self.window = window
+        self.cooldown = cooldown
+        self._outcomes = deque()
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state(time.monotonic())
+
+    def _state(self, now: float) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if now - self._opened_at < self.cooldown:
+            return "open"
+        return "half_open"
+
+    def retry_after(self) -> float:
+        """Seconds left in the cooldown of an open circuit, else 0."""
+        with self._lock:
+            if self._opened_at is None:
+                return 0.0
+            return max(0.0, self.cooldown - (time.monotonic() - self._opened_at))
+
+    def allow(self) -> None:
+        """Raise CircuitOpenError if a call may not be made right now."""
+        with self._lock:
+            now = time.monotonic()
+            state = self._state(now)
+            if state == "open" or (state == "half_open" and self._trial_in_flight):
+                retry_after = self.cooldown - (now - self._opened_at) if state == "open" else 1.0
+                raise CircuitOpenError(f"{self.name} circuit is open, failing fast", retry_after=retry_after)
+            if state == "half_open":
+                self._trial_in_flight = True
+
+    def record(self, success: bool) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if self._state(now) == "half_open":
+                self._trial_in_flight = False
+                self._outcomes.clear()
+                self._opened_at = None if success else now
+                return
+
+            self._outcomes.append((now, success))
+            while self._outcomes and now - self._outcomes[0][0] > self.window:
+                self._outcomes.popleft()
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+            if (len(self._outcomes) >= self.min_calls
+                    and failures / len(self._outcomes) >= self.failure_threshold):
+                self._opened_at = now
+                print(f"{self.name} circuit opened ({failures}/{len(self._outcomes)} calls failed)")
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+            return {
+                "state": self._state(time.monotonic()),
+                "calls": len(self._outcomes),
+                "failures": failures,
+            }
+
+
+# -------------------------
+# Hedged requests
+# -------------------------
+
+class LatencyTracker:
+    """Rolling window of call latencies used to derive the hedging delay."""
+
+    def __init__(self, size: int = 200):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float, min_samples: int = 20) -> Optional[float]:
+        with self._lock:
+            if not self._samples or len(self._samples) < min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+_hedge_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="hedge")
+
+
+def hedged_call(fn: Callable[[], T], delay: Optional[float]) -> T:
+    """
+    Run fn, and if it has not finished after `delay` seconds start a
+    duplicate; whichever finishes first successfully wins.
+
+    With no delay (not enough latency samples yet) fn runs once inline.
+    """
+    if delay is None:
+        return fn()
+
+    primary = _hedge_executor.submit(contextvars.copy_context().run, fn)
+    done, _ = wait([primary], timeout=delay)
+    if done:
+        return primary.result()
+
+    hedge = _hedge_executor.submit(contextvars.copy_context().run, fn)
+    pending = {primary, hedge}
+    error: Optional[BaseException] = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+            error = future.exception()
+    raise error
@@ -0,0 +1,236 @@
+import asyncio
+import json
+import re
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, model_validator
+
+from rag.llm import generate_text
+from rag.summarizer import generate_summary
+from rag.question_generator import generate_questions
+from rag.extractive import extractive_summary
+from vectorestore.selection import select_coverage
+from ingestion.pipeline import artifact_key
+from store.artifact_store import get_store, SUMMARY, QUESTIONS
+from scheduler.stages import run_stage
+from reports.report import clean_json
+
+STUDY_PACK = "study_pack"
+
+# Context chunks shared by the summary and the questions
+STUDY_PACK_CHUNKS = 8
+
+
+class StudyPackRequest(BaseModel):
+    url: Optional[str] = None
+    video_id: Optional[str] = None
+    language: str = "en"
+
+    @model_validator(mode="after")
+    def validate_input(self):
+        if not self.url and not self.video_id:
+            raise ValueError("Either 'url' or 'video_id' must be provided")
+        return self
+
+
+class MCQ(BaseModel):
+    question: str
+    options: Dict[str, str]
+    answer: Optional[str] = None
+
+
+class StudyPackResponse(BaseModel):
+    video_id: str
+    language: str
+    paragraph: str
+    bullets: List[str]
+    mcqs: List[MCQ]
+    descriptive_questions: List[str]
+    summary: str
+    questions: str
+    transcript_lines: int
+    total_chunks: int
+    chunks_used: int
+    llm_calls: int
+    cached: bool = False
+    message: str = "Study pack generated successfully"
+
+
+def _build_prompt(chunks: List[Dict]) -> str:
+    context = "\n\n".join(
+        f"[{c.get('start_time', 'N/A')} - {c.get('end_time', 'N/A')}]\n{c.get('text', '')}"
+        for c in chunks
+    )
+    return f"""
+You are an educational assistant. From the following YouTube video transcript content, create a study pack:
+1. "paragraph": a friendly, engaging paragraph (4-6 sentences) summarizing the video in a conversational tone
+2. "bullets": 5-7 concise bullet points with the key points, 1-2 sentences each
+3. "mcqs": exactly 5 multiple choice questions, each with 4 options (A, B, C, D) and the correct letter
+4. "descriptive_questions": exactly 5 descriptive (short-answer) questions
+Use ONLY the given content.
+Do NOT add information outside the transcript.
+Transcript:
+{context}
+Respond ONLY with JSON in this format:
+{{"paragraph": "...", "bullets": ["..."], "mcqs": [{{"question": "...", "options": {{"A": "...", "B": "...", "C": "...", "D": "..."}}, "answer": "A"}}], "descriptive_questions": ["..."]}}
+"""
+
+
+def _parse_pack(output: str) -> Optional[Dict]:
+    """Validate the structured response; None if any part is missing."""
+    try:
+        data = clean_json(output)
+    except (json.JSONDecodeError, TypeError):
+        return None
+    if not isinstance(data, dict):
+        return None
+
+    bullets = [str(b).strip("-•* ").strip() for b in data.get("bullets") or [] if str(b).strip()]
+    mcqs = []
+    for item in data.get("mcqs") or []:
+        if not isinstance(item, dict) or not item.get("question") or not isinstance(item.get("options"), dict):
+            continue
+        answer = str(item.get("answer") or "").strip().upper()[:1] or None
+        mcqs.append({
+            "question": str(item["question"]).strip(),
+            "options": {str(k).strip().upper(): str(v).strip() for k, v in item["options"].items()},
+            "answer": answer,
+        })
+    descriptive = [str(q).strip() for q in data.get("descriptive_questions") or [] if str(q).strip()]
+
+    paragraph = str(data.get("paragraph") or "").strip()
+    if not paragraph or not bullets or not mcqs or not descriptive:
+        return None
+    return {"paragraph": paragraph, "bullets": bullets, "mcqs": mcqs, "descriptive_questions": descriptive}
+
+
+_MCQ_RE = re.compile(r"^\s*\d+[.)]\s*(.+)$")
+_OPTION_RE = re.compile(r"^\s*([A-D])[).:]\s*(.+)$")
+_ANSWER_RE = re.compile(r"correct answer\s*:\s*\(?([A-D])", re.IGNORECASE)
+
+
+def parse_questions_text(text: str) -> Tuple[List[Dict], List[str]]:
+    """Best-effort split of generate_questions output into MCQs and descriptive questions."""
+    parts = re.split(r"descriptive questions\s*:?", text, maxsplit=1, flags=re.IGNORECASE)
+    mcq_part = parts[0]
+    descriptive_part = parts[1] if len(parts) > 1 else ""
+    mcqs: List[Dict] = []
+    for line in mcq_part.splitlines():
+        line = line.strip("*# ")
+        option = _OPTION_RE.match(line)
+        answer = _ANSWER_RE.search(line)
+        question = _MCQ_RE.match(line)
+        if answer and mcqs:
+            mcqs[-1]["answer"] = answer.group(1).upper()
+        elif option and mcqs:
+            mcqs[-1]["options"][option.group(1)] = option.group(2).strip()
+        elif question:
+            mcqs.append({"question": question.group(1).strip(), "options": {}, "answer": None})
+    descriptive = [
+        match.group(1).strip()
+        for match in (_MCQ_RE.match(line.strip("*# ")) for line in descriptive_part.splitlines())
+        if match
+    ]
+    return mcqs, descriptive
+
+
+def format_questions(mcqs: List[Dict], descriptive: List[str]) -> str:
+    """Render questions in the /questions text format, which /evaluate grades against."""
+    lines = ["MCQs:"]
+    for n, mcq in enumerate(mcqs, start=1):
+        lines.append(f"{n}. {mcq['question']}")
+        lines.extend(f"   {letter}) {text}" for letter, text in sorted(mcq["options"].items()))
+        if mcq.get("answer"):
+            lines.append(f"   Correct Answer: {mcq['answer']}")
+    lines.append("Descriptive Questions:")
+    lines.extend(f"{n}. {question}" for n, question in enumerate(descriptive, start=1))
+    return "\n".join(lines)
+
+
+async def _generate_separately(chunks: List[Dict]) -> Tuple[Dict, int]:
+    # Fallback: summary and questions as concurrent calls over the same
+    # context; either part may fail without losing the other
+    summary, questions = await asyncio.gather(
+        run_stage("generate", generate_summary, chunks),
+        run_stage("generate", generate_questions, chunks),
+        return_exceptions=True
+    )
+    if isinstance(summary, Exception):
+        print(f"Study pack summary failed, using extractive fallback: {summary}")
+        summary = extractive_summary(chunks)
+        summary["mode"] = "extractive"
+    if isinstance(questions, Exception):
+        print(f"Study pack questions failed: {questions}")
+        questions = ""
+
+    mcqs, descriptive = parse_questions_text(questions)
+    pack = {
+        "paragraph": summary.get("paragraph", ""),
+        "bullets": summary.get("bullets", []),
+        "mcqs": mcqs,
+        "descriptive_questions": descriptive,
+        "questions": questions,
+    }
+    if summary.get("mode") == "extractive":
+        pack["mode"] = "extractive"
+    # generate_summary makes two calls, generate_questions one
+    return pack, 3
+
+
+def is_complete(pack: Dict) -> bool:
+    """An LLM-written pack with every part present; only those are cached."""
+    return (
+        pack.get("mode") != "extractive"
+        and bool(pack["paragraph"] and pack["bullets"] and pack["mcqs"] and pack["descriptive_questions"])
+    )
+
+
+async def study_pack_for_video(video_id: str, language: str, chunks: List[Dict]) -> Tuple[Dict, bool]:
+    """
+    Return (study_pack, cached) for a video.
+
+    The summary and questions come from one structured LLM call over a
+    single coverage selection of chunks; if the response is unusable
+    they are generated by concurrent calls over the same context. The
+    pack is cached as one unit, and on a fresh pack the summary and
+    question set caches of /summarize, /questions and /evaluate are
+    seeded with it when they are empty.
+    """
+    store = get_store()
+    key = artifact_key(video_id, language)
+    pack = await run_stage("fetch", store.get, STUDY_PACK, key)
+    if pack is not None:
+        return pack, True
+
+    context_chunks = await run_stage("retrieve", select_coverage, chunks, STUDY_PACK_CHUNKS)
+
+    pack, llm_calls = None, 1
+    try:
+        output = await run_stage("generate", generate_text, _build_prompt(context_chunks), task="study_pack")
+        pack = _parse_pack(output)
+        if pack is None:
+            print(f"Study pack response for {video_id} was incomplete, generating parts separately")
+    except Exception as e:
+        print(f"Study pack call failed for {video_id}: {e}")
+
+    if pack is not None:
+        pack["questions"] = format_questions(pack["mcqs"], pack["descriptive_questions"])
+    else:
+        pack, calls = await _generate_separately(context_chunks)
+        llm_calls += calls
+
+    pack["chunks_used"] = len(context_chunks)
+    pack["llm_calls"] = llm_calls
+
+    # Degraded or incomplete packs are not cached, so the next request retries
+    if is_complete(pack):
+        def save():
+            store.put(STUDY_PACK, key, pack, video_id=video_id)
+            coverage_key = f"{key}:coverage"
+            if store.get(SUMMARY, coverage_key) is None:
+                store.put(SUMMARY, coverage_key, {"paragraph": pack["paragraph"], "bullets": pack["bullets"]}, video_id=video_id)
+            if store.get(QUESTIONS, coverage_key) is None:
+                store.put(QUESTIONS, coverage_key, pack["questions"], video_id=video_id)
+
+        await run_stage("fetch", save)
+    return pack, False
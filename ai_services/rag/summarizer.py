@@ -1,5 +1,9 @@
 from typing import Dict, List, Union
-from rag.gemini_client import generate_text
+from rag.llm import generate_text
+from vectorestore.selection import select_chunks
+from ingestion.pipeline import artifact_key
+from store.artifact_store import get_store, SUMMARY
+from rag.extractive import extractive_summary
 
 def generate_summary(retrieved_chunks: list) -> Dict[str, Union[str, List[str]]]:
     """
@@ -31,7 +35,7 @@ Focus on the main ideas, key insights, and important details.
 Transcript:
 {context}
 """
-        bullet_response = generate_text(bullet_prompt)
+        bullet_response = generate_text(bullet_prompt, task="bullets")
         
         # Format bullet points
         if isinstance(bullet_response, str):
@@ -52,7 +56,7 @@ Keep it clear, concise, and easy to understand.
 Key points to include:
 {bullet_response}
 """
-        paragraph = generate_text(paragraph_prompt)
+        paragraph = generate_text(paragraph_prompt, task="summary")
         if not isinstance(paragraph, str):
             paragraph = " ".join(str(p) for p in paragraph) if isinstance(paragraph, (list, tuple)) else str(paragraph)
         return {
@@ -60,8 +64,63 @@ Key points to include:
             "bullets": bullets
         }
     except Exception as e:
-        error_msg = f"Error generating summary: {str(e)}"
-        return {
-            "paragraph": error_msg,
-            "bullets": [error_msg]
-        }
\ No newline at end of file
+        # Degraded mode: fall back to the in-process extractive summary
+        print(f"Error generating summary, using extractive fallback: {str(e)}")
+        summary = extractive_summary(retrieved_chunks)
+        summary["mode"] = "extractive"
+        return summary
+
+
+def summary_for_video(
+    video_id: str,
+    language: str,
+    chunks: list,
+    selection: str = "coverage",
+    mode: str = "llm"
+):
+    """
+    Return (summary_result, retrieved_chunks) for a video.
+
+    Successful summaries are kept in the artifact store, so every worker
+    (and the prefetcher) shares one warm copy.
+
+    Args:
+        selection: 'coverage' (chunks spread over the timeline) or 'query'
+        mode: 'llm' for an LLM summary, 'fast' for an extractive summary
+            of the whole transcript computed in-process
+    """
+    if mode == "fast":
+        summary_result = extractive_summary(chunks)
+        summary_result["mode"] = "extractive"
+        return summary_result, chunks
+
+    retrieved_chunks = select_chunks(
+        chunks,
+        query=(
+            "Provide a clear and concise summary of the entire video, "
+            "highlighting key points, events, and the main takeaway."
+        ),
+        k=8,
+        selection=selection
+    )
+
+    store = get_store()
+    key = f"{artifact_key(video_id, language)}:{selection}"
+    summary_result = store.get(SUMMARY, key)
+    if summary_result is not None:
+        return summary_result, retrieved_chunks
+
+    summary_result = generate_summary(retrieved_chunks)
+
+    # Debugging: Print the summary result
+    print("Summary result:", summary_result)
+
+    # Ensure we have valid summary content
+    if not summary_result or not isinstance(summary_result, dict):
+        raise ValueError("Invalid summary format generated")
+
+    # Degraded (extractive fallback) results are not cached, so the next
+    # request retries the LLM
+    if summary_result.get("mode") != "extractive":
+        store.put(SUMMARY, key, summary_result, video_id=video_id)
+    return summary_result, retrieved_chunks
@@ -1,7 +1,11 @@
+import io
 import json
-import os
 import re
+import zipfile
 from datetime import datetime
+from typing import Dict, Iterator, Optional
+
+from store.artifact_store import get_store, REPORT
 
 
 def clean_json(text: str) -> dict:
@@ -12,7 +16,13 @@ def clean_json(text: str) -> dict:
     return json.loads(cleaned)
 
 
-def export_report(video_id: str, evaluation_text: str):
+def build_report(video_id: str, evaluation_text: str, class_id: Optional[str] = None) -> Dict:
+    """
+    Build an evaluation report in memory and persist it in the artifact store.
+
+    Nothing is written to disk; callers serialise the returned dict
+    straight into the response.
+    """
     report_data = clean_json(evaluation_text)
 
     report = {
@@ -24,11 +34,73 @@ def export_report(video_id: str, evaluation_text: str):
         "weak_areas": report_data["weak_areas"],
         "understanding_level": report_data["understanding_level"]
     }
+    if class_id:
+        report["class_id"] = class_id
+
+    # Persist in the shared store so reports outlive worker restarts
+    get_store().put(
+        REPORT,
+        f"{video_id}:{report['generated_at']}",
+        report,
+        video_id=video_id,
+        meta={"class_id": class_id} if class_id else None
+    )
+
+    return report
+
+
+def iter_reports(
+    video_id: Optional[str] = None,
+    class_id: Optional[str] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None
+) -> Iterator[Dict]:
+    """Yield stored reports one at a time, oldest first."""
+    for artifact in get_store().iter_values(REPORT, video_id=video_id, since=since, until=until):
+        if class_id is not None and (artifact["meta"] or {}).get("class_id") != class_id:
+            continue
+        yield artifact["value"]
+
 
-    os.makedirs("reports", exist_ok=True)
-    file_path = f"reports/{video_id}_evaluation_report.json"
+def stream_ndjson(reports: Iterator[Dict]) -> Iterator[bytes]:
+    """Encode reports as newline-delimited JSON, one line per report."""
+    for report in reports:
+        yield (json.dumps(report, ensure_ascii=False) + "\n").encode("utf-8")
 
-    with open(file_path, "w", encoding="utf-8") as f:
-        json.dump(report, f, indent=4)
 
-    return file_path
+class _ZipSink(io.RawIOBase):
+    """Write-only, unseekable sink that hands zip bytes back to the caller."""
+
+    def __init__(self):
+        self._parts = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def stream_zip(reports: Iterator[Dict]) -> Iterator[bytes]:
+    """
+    Build a zip archive of reports on the fly, one JSON file per report.
+
+    zipfile writes data descriptors when its target cannot seek, so each
+    member is yielded as soon as it is compressed and only one report is
+    held in memory at a time.
+    """
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for n, report in enumerate(reports, start=1):
+            stamp = re.sub(r"[^0-9T]", "", str(report.get("generated_at", "")))
+            name = f"{report.get('video_id', 'unknown')}_{stamp or n}_evaluation_report.json"
+            archive.writestr(name, json.dumps(report, indent=4, ensure_ascii=False))
+            yield sink.drain()
+    # Central directory is written on close
+    yield sink.drain()
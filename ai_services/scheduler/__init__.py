@@ -0,0 +1,14 @@
+from .stages import run_stage, run_stage_sync, stage_metrics
+from .admission import AdmissionMiddleware, admission_metrics, current_priority
+from .profiling import ProfilingMiddleware, span
+
+__all__ = [
+    'run_stage',
+    'run_stage_sync',
+    'stage_metrics',
+    'AdmissionMiddleware',
+    'admission_metrics',
+    'current_priority',
+    'ProfilingMiddleware',
+    'span',
+]
@@ -0,0 +1,269 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict
+
+from rag.resilience import DeadlineExceeded, remaining_time
+from scheduler.profiling import open_span
+
+# Priority classes, most urgent first
+INTERACTIVE = "interactive"
+BATCH = "batch"
+BACKGROUND = "background"
+PRIORITY_ORDER = {INTERACTIVE: 0, BATCH: 1, BACKGROUND: 2}
+
+# Route -> priority class; unlisted routes are interactive
+ROUTE_PRIORITIES = {
+    "/summarize": BATCH,
+    "/questions": BATCH,
+    "/chapters": BATCH,
+    "/study-pack": BATCH,
+    "/evaluate": BATCH,
+    "/chat/batch": BATCH,
+    "/reports/export": BATCH,
+    "/prefetch": BACKGROUND,
+}
+
+# Routes that are never queued (probes, metrics and operator endpoints);
+# a prefix ending in "/" covers every route under it
+EXEMPT_ROUTES = {"/", "/health", "/docs", "/openapi.json", "/artifacts/stats", "/chat/faq/stats"}
+EXEMPT_PREFIXES = ("/metrics/", "/admin/", "/docs/")
+
+
+def is_exempt(path: str) -> bool:
+    return (path.rstrip("/") or "/") in EXEMPT_ROUTES or path.startswith(EXEMPT_PREFIXES)
+
+# Class -> (max concurrent requests, max queued requests)
+CLASS_LIMITS = {
+    INTERACTIVE: (int(os.getenv("ADMISSION_INTERACTIVE_CONCURRENCY", "32")),
+                  int(os.getenv("ADMISSION_INTERACTIVE_QUEUE", "64"))),
+    BATCH: (int(os.getenv("ADMISSION_BATCH_CONCURRENCY", "4")),
+            int(os.getenv("ADMISSION_BATCH_QUEUE", "16"))),
+    BACKGROUND: (int(os.getenv("ADMISSION_BACKGROUND_CONCURRENCY", "2")),
+                 int(os.getenv("ADMISSION_BACKGROUND_QUEUE", "8"))),
+}
+
+# Outbound requests allowed at once from this worker per LLM provider,
+# all classes
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "6"))
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "6"))
+
+_priority: contextvars.ContextVar[str] = contextvars.ContextVar("priority", default=BACKGROUND)
+
+
+def current_priority() -> str:
+    """Priority class of the current request (background outside requests)."""
+    return _priority.get()
+
+
+class Overloaded(Exception):
+    def __init__(self, priority: str, retry_after: float, reason: str):
+        super().__init__(reason)
+        self.priority = priority
+        self.retry_after = retry_after
+
+
+class PriorityClass:
+    """Concurrency slots and a bounded FIFO queue for one priority class."""
+
+    def __init__(self, name: str, concurrency: int, queue_size: int):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.active = 0
+        self._waiters: deque = deque()
+        # Smoothed time a request holds a slot, used to predict queue wait
+        self.avg_service = 1.0
+        self.admitted = 0
+        self.rejected = 0
+
+    def estimated_wait(self, position: int) -> float:
+        return math.ceil(position / self.concurrency) * self.avg_service
+
+    async def acquire(self) -> None:
+        if self.active < self.concurrency and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return
+
+        if len(self._waiters) >= self.queue_size:
+            self.rejected += 1
+            raise Overloaded(self.name, self.estimated_wait(len(self._waiters) + 1), "queue full")
+
+        wait = self.estimated_wait(len(self._waiters) + 1)
+        remaining = remaining_time()
+        if remaining is not None and wait > remaining:
+            # Queueing would only end in a deadline miss; reject now
+            self.rejected += 1
+            raise Overloaded(self.name, wait, "queue wait would exceed the request deadline")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout=remaining)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise Overloaded(self.name, self.estimated_wait(len(self._waiters) + 1), "deadline expired in queue")
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we gave up; pass it on
+                self.release(0.0)
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+        self.admitted += 1
+
+    def release(self, service_time: float) -> None:
+        if service_time:
+            self.avg_service = 0.8 * self.avg_service + 0.2 * service_time
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # Hand the slot straight to the next waiter
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def metrics(self) -> Dict:
+        return {
+            "concurrency": self.concurrency,
+            "active": self.active,
+            "queued": len(self._waiters),
+            "queue_size": self.queue_size,
+            "avg_service_s": round(self.avg_service, 3),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
+
+
+CLASSES = {name: PriorityClass(name, *limits) for name, limits in CLASS_LIMITS.items()}
+
+
+def route_priority(path: str, headers: list) -> str:
+    priority = ROUTE_PRIORITIES.get(path.rstrip("/") or "/", INTERACTIVE)
+    if path.startswith("/prefetch/"):
+        priority = INTERACTIVE  # job status polling
+    for name, value in headers:
+        if name == b"x-priority":
+            requested = value.decode("latin-1").strip().lower()
+            # Clients may lower their priority, never raise it
+            if PRIORITY_ORDER.get(requested, -1) > PRIORITY_ORDER[priority]:
+                priority = requested
+    return priority
+
+
+class AdmissionMiddleware:
+    """
+    Admit each HTTP request into its priority class or reject it early.
+
+    Requests that cannot get a slot wait in their class's bounded queue;
+    if the queue is full or the predicted wait exceeds the request's
+    remaining deadline, the client gets 503 with Retry-After immediately.
+    Must run inside DeadlineMiddleware.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or is_exempt(scope["path"]):
+            return await self.app(scope, receive, send)
+
+        priority = route_priority(scope["path"], scope.get("headers", []))
+        admission = CLASSES[priority]
+        queued = open_span("admission", {"priority": priority})
+        try:
+            await admission.acquire()
+        except Overloaded as e:
+            return await self._reject(send, e)
+        finally:
+            if queued is not None:
+                queued.finish()
+
+        token = _priority.set(priority)
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _priority.reset(token)
+            admission.release(time.monotonic() - started)
+
+    @staticmethod
+    async def _reject(send, error: Overloaded) -> None:
+        body = json.dumps({
+            "detail": f"Server overloaded ({error.priority}): {error}",
+        }).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"retry-after", str(max(1, math.ceil(error.retry_after))).encode()),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+class PriorityGate:
+    """
+    Counting semaphore for outbound calls that wakes the most urgent
+    waiter first (interactive before batch before background, FIFO within
+    a class). Waiting never outlasts the caller's deadline.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self._waiting = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def slot(self):
+        entry = (PRIORITY_ORDER[current_priority()], next(self._counter))
+        with self._cond:
+            heapq.heappush(self._waiting, entry)
+            try:
+                while self.active >= self.limit or self._waiting[0] != entry:
+                    remaining = remaining_time()
+                    if remaining is not None and remaining <= 0:
+                        raise DeadlineExceeded("Request deadline exceeded waiting for an LLM slot")
+                    self._cond.wait(timeout=remaining)
+            finally:
+                self._waiting.remove(entry)
+                heapq.heapify(self._waiting)
+                # Another waiter may now be at the head of the heap
+                self._cond.notify_all()
+            self.active += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.active -= 1
+                self._cond.notify_all()
+
+    def metrics(self) -> Dict:
+        with self._cond:
+            return {"limit": self.limit, "active": self.active, "waiting": len(self._waiting)}
+
+
+gemini_gate = PriorityGate(GEMINI_MAX_CONCURRENCY)
+openai_gate = PriorityGate(OPENAI_MAX_CONCURRENCY)
+
+
+def admission_metrics() -> Dict:
+    return {
+        "classes": {name: cls.metrics() for name, cls in CLASSES.items()},
+        "gemini": gemini_gate.metrics(),
+        "openai": openai_gate.metrics(),
+    }
@@ -0,0 +1,267 @@
+import contextvars
+import hmac
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs
+
+from starlette.concurrency import run_in_threadpool
+
+from store.artifact_store import get_store
+
+PROFILE = "profile"
+
+# Shared secret for profiling. Unset (the default) disables it entirely;
+# otherwise profiled requests and /admin/profiles must send it in the
+# X-Profile-Token header, since profiles expose stacks and request details
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN")
+
+# Seconds between stack samples of a profiled request's threads
+SAMPLE_INTERVAL = 0.005
+
+# Frames kept per sample and distinct stacks kept per profile
+MAX_STACK_DEPTH = 40
+MAX_STACKS = 500
+
+_trace: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar("trace", default=None)
+_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("span", default=None)
+
+_NO_SPAN = nullcontext()
+
+
+class Span:
+    def __init__(self, trace: "Trace", name: str, attrs: Dict):
+        self.trace = trace
+        self.name = name
+        self.attrs = attrs
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.children: List["Span"] = []
+
+    def finish(self) -> None:
+        self.end = time.perf_counter()
+
+    def to_dict(self, origin: float) -> Dict:
+        return {
+            "name": self.name,
+            "attrs": self.attrs,
+            "start_ms": round((self.start - origin) * 1000, 2),
+            "duration_ms": round(((self.end or time.perf_counter()) - self.start) * 1000, 2),
+            "children": [child.to_dict(origin) for child in self.children],
+        }
+
+
+class Trace:
+    """
+    Span tree and stack samples of one profiled request.
+
+    Only threads currently running one of the request's spans are
+    sampled, so work done for other requests on shared stage workers is
+    not attributed to it.
+    """
+
+    def __init__(self, name: str):
+        self.profile_id = uuid.uuid4().hex[:12]
+        self.created_at = time.time()
+        self.root = Span(self, name, {})
+        self._lock = threading.Lock()
+        self._threads: Counter = Counter()
+        self._stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, name=f"profiler-{self.profile_id}", daemon=True)
+
+    def open_span(self, name: str, attrs: Dict, parent: Optional[Span]) -> Span:
+        span = Span(self, name, attrs)
+        with self._lock:
+            (parent or self.root).children.append(span)
+        return span
+
+    def enter_thread(self) -> None:
+        with self._lock:
+            self._threads[threading.get_ident()] += 1
+
+    def exit_thread(self) -> None:
+        ident = threading.get_ident()
+        with self._lock:
+            self._threads[ident] -= 1
+            if self._threads[ident] <= 0:
+                del self._threads[ident]
+
+    def _sample(self) -> None:
+        while not self._stop.wait(SAMPLE_INTERVAL):
+            with self._lock:
+                threads = list(self._threads)
+            if not threads:
+                continue
+            frames = sys._current_frames()
+            for ident in threads:
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+                    frame = frame.f_back
+                self._stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+    def start(self) -> "Trace":
+        self._sampler.start()
+        return self
+
+    def stop(self) -> None:
+        self.root.finish()
+        self._stop.set()
+        self._sampler.join()
+
+    def to_dict(self, meta: Dict) -> Dict:
+        return {
+            "profile_id": self.profile_id,
+            "created_at": self.created_at,
+            **meta,
+            "duration_ms": round((self.root.end - self.root.start) * 1000, 2),
+            "sample_interval_ms": SAMPLE_INTERVAL * 1000,
+            "samples": self.samples,
+            # Folded stacks (root;...;leaf -> sample count), hottest first
+            "stacks": dict(self._stacks.most_common(MAX_STACKS)),
+            "spans": self.root.to_dict(self.root.start),
+        }
+
+
+@contextmanager
+def _traced_span(trace: Trace, name: str, attrs: Dict):
+    span_ = trace.open_span(name, attrs, _span.get())
+    token = _span.set(span_)
+    trace.enter_thread()
+    try:
+        yield span_
+    finally:
+        trace.exit_thread()
+        _span.reset(token)
+        span_.finish()
+
+
+def span(name: str, **attrs):
+    """
+    Record a named span in the current request's trace, if it is being
+    profiled. Without an active trace this is a shared no-op context.
+    """
+    trace = _trace.get()
+    if trace is None:
+        return _NO_SPAN
+    return _traced_span(trace, name, attrs)
+
+
+def open_span(name: str, attrs: Dict) -> Optional[Span]:
+    """
+    Open a span that is finished explicitly rather than by a with block,
+    e.g. a stage task from submission to completion. The calling thread
+    is not sampled for it. Returns None when profiling is off.
+    """
+    trace = _trace.get()
+    if trace is None:
+        return None
+    return trace.open_span(name, attrs, _span.get())
+
+
+def bind_span(context: contextvars.Context, span_: Span) -> None:
+    """Make span_ the parent of spans opened inside context."""
+    context.run(_span.set, span_)
+
+
+def profile_token_valid(token: Optional[str]) -> bool:
+    if not PROFILE_TOKEN or token is None:
+        return False
+    return hmac.compare_digest(token.encode("latin-1"), PROFILE_TOKEN.encode("latin-1"))
+
+
+def _wants_profile(scope) -> bool:
+    if not PROFILE_TOKEN:
+        return False
+    headers = dict(scope.get("headers", []))
+    token = headers.get(b"x-profile-token")
+    if not profile_token_valid(token.decode("latin-1") if token is not None else None):
+        return False
+    flag = headers.get(b"x-profile")
+    if flag is not None:
+        return flag.strip().lower() in (b"1", b"true", b"yes")
+    query = scope.get("query_string", b"")
+    if b"profile" not in query:
+        return False
+    values = parse_qs(query.decode("latin-1")).get("profile", [])
+    return any(v.lower() in ("1", "true", "yes") for v in values)
+
+
+def _store_profile(trace: "Trace", scope, status_code: Optional[int]) -> None:
+    # Joins the sampler thread and writes to SQLite: kept off the event loop
+    trace.stop()
+    profile = trace.to_dict({
+        "method": scope["method"],
+        "path": scope["path"],
+        "query": scope.get("query_string", b"").decode("latin-1"),
+        "status": status_code,
+    })
+    try:
+        get_store().put(PROFILE, trace.profile_id, profile, meta={
+            "path": scope["path"],
+            "status": status_code,
+            "duration_ms": profile["duration_ms"],
+        })
+    except Exception as e:
+        print(f"Failed to store profile {trace.profile_id}: {e}")
+
+
+class ProfilingMiddleware:
+    """
+    Run a request under the sampling profiler and span tracer when it
+    sends 'X-Profile: 1' or '?profile=1' together with a valid
+    X-Profile-Token (see PROFILE_TOKEN).
+
+    The profile is stored in the artifact store and its id is returned
+    in the X-Profile-Id response header. Other requests only pay for the
+    flag check.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _wants_profile(scope):
+            return await self.app(scope, receive, send)
+
+        trace = Trace(f"{scope['method']} {scope['path']}").start()
+        status = {"code": None}
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message = {
+                    **message,
+                    "headers": list(message.get("headers", [])) + [(b"x-profile-id", trace.profile_id.encode())],
+                }
+            await send(message)
+
+        token = _trace.set(trace)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            _trace.reset(token)
+            await run_in_threadpool(_store_profile, trace, scope, status["code"])
+
+
+def list_profiles() -> List[Dict]:
+    return [
+        {"profile_id": entry["key"], "created_at": entry["created_at"], **(entry.get("meta") or {})}
+        for entry in get_store().list_keys(PROFILE)
+    ]
+
+
+def get_profile(profile_id: str) -> Optional[Dict]:
+    return get_store().get(PROFILE, profile_id)
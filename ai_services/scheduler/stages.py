@@ -0,0 +1,215 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import CancelledError, Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+
+from scheduler.admission import INTERACTIVE, PRIORITY_ORDER, current_priority
+from scheduler.profiling import bind_span, open_span, span
+
+# Stage name -> (executor kind, default max concurrency). I/O stages run in
+# threads; CPU-heavy stages run in a process pool so they cannot hold the
+# GIL against request handling.
+STAGE_CONFIG = {
+    "fetch": ("thread", 16),     # transcript listing/fetch, artifact store reads
+    "chunk": ("thread", 4),      # chunk set lookup and assembly
+    "index": ("thread", 1),      # corpus index updates (in-process state)
+    "retrieve": ("thread", 4),   # chunk selection and extractive ranking
+    "generate": ("thread", 8),   # outbound Gemini calls
+    "cpu": ("process", 2),       # large chunking jobs, Whisper transcription
+}
+
+# Stage name -> workers kept free for interactive requests; batch and
+# background work (chapter fan-out, prefetch) never fills these
+INTERACTIVE_RESERVE = {
+    "generate": 2,
+}
+
+
+class Stage:
+    """
+    A pipeline stage with its own bounded executor and queue metrics.
+
+    Work submitted beyond max_workers waits in the stage's own queue, so
+    a backlog in one stage never occupies the workers of another. The
+    queue is ordered by the submitting request's priority class, then by
+    arrival, and `reserved` workers only take interactive work.
+    """
+
+    def __init__(self, name: str, kind: str, max_workers: int, reserved: int = 0):
+        self.name = name
+        self.kind = kind
+        self.max_workers = max_workers
+        self.reserved = min(reserved, max_workers - 1)
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        # (priority, arrival, start, future) heap of work not yet handed
+        # to the executor; at most max_workers items are handed over
+        self._pending: list = []
+        self._arrivals = itertools.count()
+        self._active = 0
+        self.in_flight = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_wait = 0.0
+        self.total_run = 0.0
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.kind == "process":
+                        # spawn: forking a process that runs threads is unsafe
+                        self._executor = ProcessPoolExecutor(
+                            max_workers=self.max_workers,
+                            mp_context=multiprocessing.get_context("spawn")
+                        )
+                    else:
+                        self._executor = ThreadPoolExecutor(
+                            max_workers=self.max_workers,
+                            thread_name_prefix=f"stage-{self.name}"
+                        )
+        return self._executor
+
+    def _timed(self, submitted: float, fn: Callable, args: tuple, kwargs: dict) -> Any:
+        # Runs on the stage's worker thread
+        started = time.monotonic()
+        with self._lock:
+            self.running += 1
+            self.total_wait += started - submitted
+        try:
+            # Under the stage span, this child starts when the work leaves the queue
+            with span(getattr(fn, "__qualname__", "task")):
+                return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.total_run += time.monotonic() - started
+
+    def _done(self, future: Future, submitted: float, stage_span=None) -> None:
+        if stage_span is not None:
+            stage_span.finish()
+        with self._lock:
+            self.in_flight -= 1
+            if future.cancelled() or future.exception() is not None:
+                self.failed += 1
+            else:
+                self.completed += 1
+            if self.kind == "process":
+                # Wait and run time cannot be split across the process boundary
+                self.total_run += time.monotonic() - submitted
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        submitted = time.monotonic()
+        with self._lock:
+            self.in_flight += 1
+        # None unless the current request is being profiled
+        stage_span = open_span(f"stage:{self.name}", {"kind": self.kind})
+        if self.kind == "process":
+            start = partial(self.executor.submit, fn, *args, **kwargs)
+        else:
+            # Copy the caller's context so request deadlines follow the work
+            context = contextvars.copy_context()
+            if stage_span is not None:
+                bind_span(context, stage_span)
+            start = partial(self.executor.submit, context.run, self._timed, submitted, fn, args, kwargs)
+        future = self._enqueue(PRIORITY_ORDER[current_priority()], start)
+        future.add_done_callback(lambda f: self._done(f, submitted, stage_span))
+        return future
+
+    def _enqueue(self, priority: int, start: Callable[[], Future]) -> Future:
+        future = Future()
+        with self._lock:
+            heapq.heappush(self._pending, (priority, next(self._arrivals), start, future))
+        self._dispatch()
+        return future
+
+    def _dispatch(self) -> None:
+        """Hand queued work to the executor while a worker may take it."""
+        while True:
+            with self._lock:
+                if not self._pending or self._active >= self.max_workers:
+                    return
+                # The head is the most urgent item: if it is not
+                # interactive, nothing queued may use a reserved worker
+                if (self._pending[0][0] > PRIORITY_ORDER[INTERACTIVE]
+                        and self._active >= self.max_workers - self.reserved):
+                    return
+                _, _, start, future = heapq.heappop(self._pending)
+                self._active += 1
+            if not future.set_running_or_notify_cancel():
+                self._release()
+                continue
+            try:
+                inner = start()
+            except BaseException as e:
+                self._release()
+                future.set_exception(e)
+                continue
+            inner.add_done_callback(lambda f, outer=future: self._relay(f, outer))
+
+    def _release(self) -> None:
+        with self._lock:
+            self._active -= 1
+
+    def _relay(self, inner: Future, outer: Future) -> None:
+        self._release()
+        if inner.cancelled():
+            outer.set_exception(CancelledError())
+        elif inner.exception() is not None:
+            outer.set_exception(inner.exception())
+        else:
+            outer.set_result(inner.result())
+        self._dispatch()
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            finished = self.completed + self.failed
+            running = self.running if self.kind == "thread" else self._active
+            return {
+                "kind": self.kind,
+                "max_workers": self.max_workers,
+                "interactive_reserve": self.reserved,
+                "queued": self.in_flight - running,
+                "running": running,
+                "completed": self.completed,
+                "failed": self.failed,
+                "avg_wait_ms": round(self.total_wait / finished * 1000, 1) if finished and self.kind == "thread" else None,
+                "avg_run_ms": round(self.total_run / finished * 1000, 1) if finished else None,
+            }
+
+
+def _stage_workers(name: str, default: int) -> int:
+    return int(os.getenv(f"STAGE_{name.upper()}_WORKERS", str(default)))
+
+
+def _stage_reserve(name: str) -> int:
+    return int(os.getenv(f"STAGE_{name.upper()}_RESERVE", str(INTERACTIVE_RESERVE.get(name, 0))))
+
+
+STAGES: Dict[str, Stage] = {
+    name: Stage(name, kind, _stage_workers(name, workers), _stage_reserve(name))
+    for name, (kind, workers) in STAGE_CONFIG.items()
+}
+
+
+async def run_stage(stage: str, fn: Callable, *args, **kwargs) -> Any:
+    """Run fn on a stage's executor without blocking the event loop."""
+    return await asyncio.wrap_future(STAGES[stage].submit(fn, *args, **kwargs))
+
+
+def run_stage_sync(stage: str, fn: Callable, *args, **kwargs) -> Any:
+    """Run fn on a stage's executor from synchronous code and wait for it."""
+    return STAGES[stage].submit(fn, *args, **kwargs).result()
+
+
+def stage_metrics() -> Dict[str, Dict]:
+    return {name: stage.metrics() for name, stage in STAGES.items()}
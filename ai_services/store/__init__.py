@@ -0,0 +1,3 @@
+from .artifact_store import ArtifactStore, get_store
+
+__all__ = ['ArtifactStore', 'get_store']
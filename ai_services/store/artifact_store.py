@@ -0,0 +1,400 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# Artifact kinds shared by every worker
+TRANSCRIPT = "transcript"
+TRANSLATION = "translation"
+CHUNKS = "chunks"
+SUMMARY = "summary"
+QUESTIONS = "questions"
+REPORT = "report"
+WHISPER_CHECKPOINT = "whisper_checkpoint"
+WHISPER_TRANSCRIPT = "whisper_transcript"
+CHAPTERS = "chapters"
+LIVE = "live"
+
+DEFAULT_DB_PATH = os.getenv("ARTIFACT_STORE_PATH", "artifacts.db")
+DEFAULT_MAX_BYTES = int(os.getenv("ARTIFACT_STORE_MAX_BYTES", str(512 * 1024 * 1024)))
+DEFAULT_PINNED_MAX_BYTES = int(os.getenv("ARTIFACT_STORE_PINNED_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+
+# Kinds that are never evicted to make room for cache entries; Whisper
+# results take hours of CPU to recompute, and chunk sets are the source
+# of the cross-video search index (an evicted set drops out of /search).
+# They have their own, larger budget and only evict each other.
+PINNED_KINDS = {REPORT, WHISPER_CHECKPOINT, WHISPER_TRANSCRIPT, CHUNKS}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    video_id TEXT NOT NULL,
+    data BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    meta TEXT,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (kind, key)
+);
+CREATE INDEX IF NOT EXISTS idx_artifacts_video_kind ON artifacts (video_id, kind);
+CREATE INDEX IF NOT EXISTS idx_artifacts_kind_created ON artifacts (kind, created_at);
+CREATE INDEX IF NOT EXISTS idx_artifacts_accessed ON artifacts (accessed_at);
+"""
+
+# Running byte total per kind, kept by triggers so eviction never has to
+# scan the artifacts table
+_SIZE_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS artifact_sizes (kind TEXT PRIMARY KEY, bytes INTEGER NOT NULL)",
+    """CREATE TRIGGER IF NOT EXISTS artifacts_size_insert AFTER INSERT ON artifacts BEGIN
+        INSERT INTO artifact_sizes (kind, bytes) VALUES (NEW.kind, NEW.size)
+        ON CONFLICT (kind) DO UPDATE SET bytes = bytes + excluded.bytes;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS artifacts_size_delete AFTER DELETE ON artifacts BEGIN
+        UPDATE artifact_sizes SET bytes = bytes - OLD.size WHERE kind = OLD.kind;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS artifacts_size_update AFTER UPDATE OF size ON artifacts BEGIN
+        UPDATE artifact_sizes SET bytes = bytes + NEW.size - OLD.size WHERE kind = NEW.kind;
+    END""",
+]
+
+# An upsert, since INSERT OR REPLACE deletes the old row without firing
+# the delete trigger
+_UPSERT = (
+    "INSERT INTO artifacts "
+    "(kind, key, video_id, data, size, meta, created_at, accessed_at) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (kind, key) DO UPDATE SET video_id = excluded.video_id, data = excluded.data, "
+    "size = excluded.size, meta = excluded.meta, created_at = excluded.created_at, "
+    "accessed_at = excluded.accessed_at"
+)
+
+# Reads never write: access times are collected in memory and written in
+# one batch at most this often (and before every eviction). A read only
+# records an access when the stored time is older than this, so LRU order
+# is accurate to ACCESS_FLUSH_INTERVAL seconds.
+ACCESS_FLUSH_INTERVAL = 30.0
+
+
+class ArtifactStore:
+    """
+    Local artifact store shared by every uvicorn worker on the host.
+
+    Artifacts are JSON values compressed into blob columns of a single
+    SQLite database in WAL mode, so any number of readers can run
+    alongside one writer without blocking each other.
+
+    Args:
+        path: SQLite database file
+        max_bytes: Total compressed size of cache entries kept before the
+            least recently used ones are evicted
+        pinned_max_bytes: Same for PINNED_KINDS, which are budgeted
+            separately so they can never crowd out the cache
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_DB_PATH,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        pinned_max_bytes: int = DEFAULT_PINNED_MAX_BYTES
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.pinned_max_bytes = pinned_max_bytes
+        self._local = threading.local()
+        self._accessed: Dict[tuple, float] = {}
+        self._accessed_lock = threading.Lock()
+        self._last_flush = time.time()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        conn.executescript(_SCHEMA)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            new_totals = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'artifact_sizes'"
+            ).fetchone() is None
+            for statement in _SIZE_SCHEMA:
+                conn.execute(statement)
+            if new_totals:
+                # Store created before the running totals existed
+                conn.execute(
+                    "INSERT INTO artifact_sizes (kind, bytes) "
+                    "SELECT kind, SUM(size) FROM artifacts GROUP BY kind"
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread; sqlite3 connections are not thread safe
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _encode(value: Any) -> bytes:
+        return zlib.compress(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+    @staticmethod
+    def _decode(blob: bytes) -> Any:
+        return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+    def put(
+        self,
+        kind: str,
+        key: str,
+        value: Any,
+        video_id: str = "",
+        meta: Optional[Dict] = None
+    ) -> None:
+        """Insert or replace an artifact, then evict if the store is over budget."""
+        blob = self._encode(value)
+        now = time.time()
+        conn = self._connect()
+        conn.execute(
+            _UPSERT,
+            (kind, key, video_id, blob, len(blob),
+             json.dumps(meta) if meta is not None else None, now, now)
+        )
+        self.evict()
+
+    def get(self, kind: str, key: str) -> Optional[Any]:
+        """Return a stored artifact, or None if it is missing."""
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT data, accessed_at FROM artifacts WHERE kind = ? AND key = ?",
+            (kind, key)
+        ).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if now - row[1] > ACCESS_FLUSH_INTERVAL:
+            with self._accessed_lock:
+                self._accessed[(kind, key)] = now
+        if now - self._last_flush > ACCESS_FLUSH_INTERVAL:
+            self._flush_accessed(wait=False)
+        return self._decode(row[0])
+
+    def _flush_accessed(self, wait: bool = True) -> None:
+        """
+        Write collected access times in one statement. With wait=False
+        (from a read) the flush is skipped while another connection holds
+        the write lock, so reads never block on writers.
+        """
+        with self._accessed_lock:
+            accessed, self._accessed = self._accessed, {}
+            self._last_flush = time.time()
+        if not accessed:
+            return
+        conn = self._connect()
+        if not wait:
+            conn.execute("PRAGMA busy_timeout=0")
+        try:
+            conn.executemany(
+                "UPDATE artifacts SET accessed_at = MAX(accessed_at, ?) WHERE kind = ? AND key = ?",
+                [(at, kind, key) for (kind, key), at in accessed.items()]
+            )
+        except sqlite3.OperationalError:
+            # Locked: keep the access times for the next flush
+            with self._accessed_lock:
+                for item, at in accessed.items():
+                    self._accessed[item] = max(at, self._accessed.get(item, 0.0))
+        finally:
+            if not wait:
+                conn.execute("PRAGMA busy_timeout=30000")
+
+    def update(
+        self,
+        kind: str,
+        key: str,
+        fn: Callable[[Optional[Any]], Any],
+        video_id: str = "",
+        meta: Optional[Dict] = None
+    ) -> Any:
+        """
+        Replace an artifact with fn(current value or None) in one write
+        transaction, so concurrent read-modify-writes from other workers
+        are not lost. Returns the new value.
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT data FROM artifacts WHERE kind = ? AND key = ?",
+                (kind, key)
+            ).fetchone()
+            value = fn(self._decode(row[0]) if row is not None else None)
+            blob = self._encode(value)
+            now = time.time()
+            conn.execute(
+                _UPSERT,
+                (kind, key, video_id, blob, len(blob),
+                 json.dumps(meta) if meta is not None else None, now, now)
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self.evict()
+        return value
+
+    def delete(self, kind: str, key: str) -> None:
+        self._connect().execute(
+            "DELETE FROM artifacts WHERE kind = ? AND key = ?", (kind, key)
+        )
+
+    def delete_video(self, video_id: str, kind: Optional[str] = None) -> int:
+        """Delete every artifact of a video (optionally of one kind)."""
+        conn = self._connect()
+        if kind is None:
+            cursor = conn.execute("DELETE FROM artifacts WHERE video_id = ?", (video_id,))
+        else:
+            cursor = conn.execute(
+                "DELETE FROM artifacts WHERE video_id = ? AND kind = ?", (video_id, kind)
+            )
+        return cursor.rowcount
+
+    def list_keys(self, kind: str, video_id: Optional[str] = None) -> List[Dict]:
+        """List artifact keys and metadata, newest first, without loading blobs."""
+        query = "SELECT key, video_id, size, meta, created_at FROM artifacts WHERE kind = ?"
+        params: list = [kind]
+        if video_id is not None:
+            query += " AND video_id = ?"
+            params.append(video_id)
+        query += " ORDER BY created_at DESC"
+        return [
+            {
+                "key": key,
+                "video_id": vid,
+                "size": size,
+                "meta": json.loads(meta) if meta else None,
+                "created_at": created_at,
+            }
+            for key, vid, size, meta, created_at in self._connect().execute(query, params)
+        ]
+
+    def iter_values(
+        self,
+        kind: str,
+        video_id: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None
+    ) -> Iterator[Dict]:
+        """
+        Yield artifacts of one kind lazily, oldest first.
+
+        Rows are pulled from the cursor one at a time, so memory stays
+        constant no matter how many artifacts match.
+        """
+        query = "SELECT key, video_id, data, meta, created_at FROM artifacts WHERE kind = ?"
+        params: list = [kind]
+        if video_id is not None:
+            query += " AND video_id = ?"
+            params.append(video_id)
+        if since is not None:
+            query += " AND created_at >= ?"
+            params.append(since)
+        if until is not None:
+            query += " AND created_at < ?"
+            params.append(until)
+        query += " ORDER BY created_at"
+
+        # A dedicated connection keeps the read snapshot independent of
+        # writes made on this thread while the caller is iterating
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        try:
+            for key, vid, data, meta, created_at in conn.execute(query, params):
+                yield {
+                    "key": key,
+                    "video_id": vid,
+                    "value": self._decode(data),
+                    "meta": json.loads(meta) if meta else None,
+                    "created_at": created_at,
+                }
+        finally:
+            conn.close()
+
+    def total_size(self) -> int:
+        row = self._connect().execute("SELECT COALESCE(SUM(bytes), 0) FROM artifact_sizes").fetchone()
+        return int(row[0])
+
+    def _budget_sizes(self) -> Tuple[int, int]:
+        """(cache bytes, pinned bytes) from the running totals."""
+        cache = pinned = 0
+        for kind, size in self._connect().execute("SELECT kind, bytes FROM artifact_sizes"):
+            if kind in PINNED_KINDS:
+                pinned += size
+            else:
+                cache += size
+        return cache, pinned
+
+    def stats(self) -> Dict:
+        rows = self._connect().execute(
+            "SELECT kind, COUNT(*), COALESCE(SUM(size), 0) FROM artifacts GROUP BY kind"
+        ).fetchall()
+        return {
+            "path": self.path,
+            "max_bytes": self.max_bytes,
+            "pinned_max_bytes": self.pinned_max_bytes,
+            "total_bytes": sum(size for _, _, size in rows),
+            "kinds": {kind: {"count": count, "bytes": size} for kind, count, size in rows},
+        }
+
+    def evict(self) -> int:
+        """
+        Drop least recently used artifacts until cache entries fit
+        max_bytes and pinned kinds fit pinned_max_bytes.
+        """
+        cache_bytes, pinned_bytes = self._budget_sizes()
+        cache_overflow = cache_bytes - self.max_bytes
+        pinned_overflow = pinned_bytes - self.pinned_max_bytes
+        if cache_overflow <= 0 and pinned_overflow <= 0:
+            return 0
+        # Evict by up-to-date access times
+        self._flush_accessed()
+        conn = self._connect()
+
+        placeholders = ", ".join("?" for _ in PINNED_KINDS)
+        victims = []
+        for overflow, condition in ((cache_overflow, "NOT IN"), (pinned_overflow, "IN")):
+            if overflow <= 0:
+                continue
+            rows = conn.execute(
+                f"SELECT kind, key, size FROM artifacts WHERE kind {condition} ({placeholders}) "
+                "ORDER BY accessed_at",
+                tuple(PINNED_KINDS)
+            )
+            for kind, key, size in rows:
+                if overflow <= 0:
+                    break
+                victims.append((kind, key))
+                overflow -= size
+
+        conn.executemany("DELETE FROM artifacts WHERE kind = ? AND key = ?", victims)
+        if victims:
+            print(f"Artifact store evicted {len(victims)} artifacts")
+        return len(victims)
+
+
+_store: Optional[ArtifactStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> ArtifactStore:
+    """Return the process-wide artifact store, opening it on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ArtifactStore()
+    return _store
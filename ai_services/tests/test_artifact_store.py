@@ -0,0 +1,53 @@
+import os
+import tempfile
+import unittest
+
+from store.artifact_store import ArtifactStore, CHUNKS, SUMMARY, WHISPER_TRANSCRIPT
+
+
+class ArtifactStoreEvictionTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "artifacts.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_pinned_data_over_max_bytes_keeps_cache_working(self):
+        store = ArtifactStore(self.path, max_bytes=2000, pinned_max_bytes=10 ** 9)
+        for n in range(20):
+            store.put(WHISPER_TRANSCRIPT, f"video{n}:small", [os.urandom(200).hex()], video_id=f"video{n}")
+        self.assertGreater(store.total_size(), store.max_bytes)
+
+        store.put(SUMMARY, "video0:en:coverage", {"paragraph": "fresh"}, video_id="video0")
+        self.assertEqual(store.get(SUMMARY, "video0:en:coverage"), {"paragraph": "fresh"})
+        self.assertEqual(len(store.list_keys(WHISPER_TRANSCRIPT)), 20)
+
+    def test_cache_evicts_least_recently_used(self):
+        store = ArtifactStore(self.path, max_bytes=1500, pinned_max_bytes=10 ** 9)
+        for n in range(10):
+            store.put(SUMMARY, f"video{n}:en", [os.urandom(300).hex()], video_id=f"video{n}")
+        self.assertLessEqual(store.total_size(), store.max_bytes)
+        self.assertIsNone(store.get(SUMMARY, "video0:en"))
+        self.assertIsNotNone(store.get(SUMMARY, "video9:en"))
+
+    def test_pinned_kinds_evict_within_their_own_budget(self):
+        store = ArtifactStore(self.path, max_bytes=10 ** 9, pinned_max_bytes=1500)
+        store.put(SUMMARY, "video0:en", {"paragraph": "cached"}, video_id="video0")
+        for n in range(10):
+            store.put(CHUNKS, f"video{n}:en:150", [os.urandom(300).hex()], video_id=f"video{n}")
+        self.assertIsNone(store.get(CHUNKS, "video0:en:150"))
+        self.assertIsNotNone(store.get(CHUNKS, "video9:en:150"))
+        self.assertIsNotNone(store.get(SUMMARY, "video0:en"))
+
+    def test_running_size_matches_stored_rows(self):
+        store = ArtifactStore(self.path)
+        store.put(SUMMARY, "a", {"x": "1" * 500}, video_id="v1")
+        store.put(SUMMARY, "a", {"x": "2"}, video_id="v1")
+        store.update(SUMMARY, "b", lambda current: (current or []) + [1], video_id="v2")
+        store.delete_video("v1")
+        self.assertEqual(store.total_size(), sum(entry["size"] for entry in store.list_keys(SUMMARY)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+
+from ingestion.normalizer import TranscriptNormalizer, normalize_transcript
+
+
+def _segments(*texts):
+    return [{"text": text, "start": float(i), "duration": 1.0} for i, text in enumerate(texts)]
+
+
+class ManualTrackTests(unittest.TestCase):
+    def test_intentional_repetition_is_kept(self):
+        transcript, stats = normalize_transcript(
+            _segments("It is what it is,", "what it is, you know?"),
+            merge_overlaps=False,
+        )
+        self.assertEqual(
+            [s["text"] for s in transcript],
+            ["It is what it is,", "what it is, you know?"],
+        )
+        self.assertEqual(stats["overlap_tokens_removed"], 0)
+
+    def test_repeated_line_is_not_folded(self):
+        transcript, _ = normalize_transcript(_segments("No.", "No."), merge_overlaps=False)
+        self.assertEqual([s["text"] for s in transcript], ["No.", "No."])
+
+    def test_streamed_manual_track_keeps_repetition(self):
+        normalizer = TranscriptNormalizer(merge_overlaps=False)
+        out = normalizer.feed(_segments("we did it", "we did it"))
+        self.assertEqual([s["text"] for s in out], ["we did it", "we did it"])
+
+
+class GeneratedTrackTests(unittest.TestCase):
+    def test_short_overlap_is_not_merged(self):
+        transcript, _ = normalize_transcript(
+            _segments("It is what it is,", "what it is, you know?")
+        )
+        self.assertEqual(len(transcript), 2)
+        self.assertEqual(transcript[1]["text"], "what it is, you know?")
+
+    def test_rolling_caption_is_merged(self):
+        transcript, _ = normalize_transcript(
+            _segments(
+                "today we are going to talk about",
+                "we are going to talk about neural networks",
+            )
+        )
+        self.assertEqual(
+            [s["text"] for s in transcript],
+            ["today we are going to talk about", "neural networks"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import threading
+import unittest
+
+from scheduler.admission import BACKGROUND, BATCH, INTERACTIVE, _priority, is_exempt
+from scheduler.stages import Stage
+
+
+def _submit(stage, priority, fn, *args):
+    token = _priority.set(priority)
+    try:
+        return stage.submit(fn, *args)
+    finally:
+        _priority.reset(token)
+
+
+class StagePriorityTest(unittest.TestCase):
+    def test_queue_is_ordered_by_priority_class(self):
+        stage = Stage("test", "thread", 1)
+        release = threading.Event()
+        order = []
+        blocker = _submit(stage, BACKGROUND, release.wait)
+        futures = [
+            _submit(stage, BACKGROUND, order.append, "background"),
+            _submit(stage, BATCH, order.append, "batch"),
+            _submit(stage, INTERACTIVE, order.append, "interactive"),
+        ]
+        release.set()
+        for future in [blocker] + futures:
+            future.result(5)
+        self.assertEqual(order, ["interactive", "batch", "background"])
+
+    def test_reserved_workers_take_only_interactive_work(self):
+        stage = Stage("test", "thread", 2, reserved=1)
+        release = threading.Event()
+        batch = [_submit(stage, BATCH, release.wait) for _ in range(3)]
+        chat = _submit(stage, INTERACTIVE, lambda: "answer")
+        self.assertEqual(chat.result(5), "answer")
+        self.assertEqual(stage.metrics()["running"], 1)
+        release.set()
+        for future in batch:
+            future.result(5)
+
+
+class ExemptRoutesTest(unittest.TestCase):
+    def test_operator_endpoints_are_exempt_by_prefix(self):
+        for path in ["/health", "/metrics/llm", "/admin/profiles/abc", "/artifacts/stats", "/chat/faq/stats"]:
+            self.assertTrue(is_exempt(path), path)
+        for path in ["/chat", "/chat/batch", "/summarize"]:
+            self.assertFalse(is_exempt(path), path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,13 +1,27 @@
 # ai_services/transcript_extracter/transcript.py
-from typing import List, Dict, Optional
-from youtube_transcript_api import YouTubeTranscriptApi
+from typing import List, Dict, Optional, Tuple, Union
+from youtube_transcript_api import (
+    YouTubeTranscriptApi,
+    TranscriptList,
+    Transcript,
+    TranscriptsDisabled,
+    NoTranscriptFound,
+    VideoUnavailable,
+)
+import hashlib
 import os
+import subprocess
+import threading
+import time
+import numpy as np
 import whisper
 import yt_dlp
 from typing import Optional
 import re
 from urllib.parse import urlparse, parse_qs
 
+from store.artifact_store import get_store, TRANSLATION, WHISPER_CHECKPOINT, WHISPER_TRANSCRIPT
+
 def get_video_id(url: str) -> Optional[str]:
     """Extract video ID from various YouTube URL formats"""
     parsed = urlparse(url)
@@ -18,70 +32,286 @@ def get_video_id(url: str) -> Optional[str]:
     return None
 
 
-def fetch_youtube_transcript(video_id: str, language: str = "en") -> Optional[List[Dict]]:
+# How long a video's track listing is reused before YouTube is asked again
+TRACK_LISTING_TTL = float(os.getenv("TRACK_LISTING_TTL", "600"))
+
+_listing_cache: Dict[str, Tuple[float, Optional[TranscriptList]]] = {}
+_listing_lock = threading.Lock()
+
+
+def list_transcript_tracks(video_id: str, use_cache: bool = True) -> Optional[TranscriptList]:
     """
-    Fetch YouTube transcript using the latest youtube-transcript-api (v2+).
-    Returns list of {'text': ..., 'start': ..., 'duration': ...} or None if unavailable.
+    Return the available transcript tracks of a video, or None if it has none.
+
+    One list() round trip per video per TRACK_LISTING_TTL; videos without
+    transcripts are cached too, so repeated misses stay cheap. With
+    use_cache=False (live streams, whose tracks appear and grow) the
+    cache is neither read nor written.
+    """
+    now = time.time()
+    if use_cache:
+        with _listing_lock:
+            cached = _listing_cache.get(video_id)
+            if cached and cached[0] > now:
+                return cached[1]
+
+    try:
+        listing = YouTubeTranscriptApi().list(video_id)
+    except (TranscriptsDisabled, NoTranscriptFound, VideoUnavailable) as e:
+        print(f"No transcript tracks for {video_id}: {e}")
+        listing = None
+
+    if not use_cache:
+        return listing
+    with _listing_lock:
+        if len(_listing_cache) >= 1024:
+            for stale in [v for v, (expires, _) in _listing_cache.items() if expires <= now]:
+                del _listing_cache[stale]
+        _listing_cache[video_id] = (now + TRACK_LISTING_TTL, listing)
+    return listing
+
+
+def resolve_track(listing: TranscriptList, language: str) -> Tuple[Optional[Transcript], Optional[str]]:
+    """
+    Pick the best track for a language without any network calls.
+
+    Preference order: manual track, generated track, translation of a
+    manual track, translation of a generated track, then any track at all.
+    Returns (track, translate_to), where translate_to is the language code
+    to translate into, or None when the track is used as is.
+    """
+    wanted = [language]
+    if '-' in language:  # e.g., 'en-US'
+        wanted.append(language.split('-')[0])
+
+    tracks = list(listing)
+    manual = [t for t in tracks if not t.is_generated]
+    generated = [t for t in tracks if t.is_generated]
+
+    for group in (manual, generated):
+        for code in wanted:
+            for track in group:
+                if track.language_code == code:
+                    return track, None
+
+    for group in (manual, generated):
+        for track in group:
+            available = {lang.language_code for lang in track.translation_languages}
+            for code in wanted:
+                if code in available:
+                    return track, code
+
+    # Fallback: any available track, in its own language
+    if tracks:
+        return (manual or generated)[0], None
+    return None, None
+
+
+def fetch_youtube_track(video_id: str, language: str = "en") -> Optional[Tuple[List[Dict], bool]]:
     """
-    api = YouTubeTranscriptApi()  # Required in new versions
+    Fetch a YouTube transcript using the latest youtube-transcript-api (v2+).
+    Returns (items, is_generated), where items is a list of
+    {'text': ..., 'start': ..., 'duration': ...} and is_generated tells
+    auto-generated (rolling) captions from manual ones; None if unavailable.
 
+    The track listing is fetched once and the best track is resolved
+    locally, so a transcript costs at most one list() and one fetch().
+    Translations are cached per (video_id, target language).
+    """
     try:
-        # First, try direct fetch with preferred language
-        preferred_langs = [language]
-        if '-' in language:  # e.g., 'en-US'
-            preferred_langs.append(language.split('-')[0])
-
-        for lang in preferred_langs:
-            try:
-                fetched = api.fetch(video_id, languages=[lang])
-                return fetched.to_raw_data()  # Convert to classic list of dicts
-            except:
-                continue
-
-        # Fallback: fetch any available (will pick best match)
-        fetched = api.fetch(video_id)
-        return fetched.to_raw_data()
+        listing = list_transcript_tracks(video_id)
+        if listing is None:
+            return None
+
+        track, translate_to = resolve_track(listing, language)
+        if track is None:
+            return None
+
+        if translate_to is None:
+            return track.fetch().to_raw_data(), track.is_generated  # Convert to classic list of dicts
+
+        store = get_store()
+        key = f"{video_id}:{translate_to}"
+        translated = store.get(TRANSLATION, key)
+        if translated is None:
+            translated = track.translate(translate_to).fetch().to_raw_data()
+            store.put(
+                TRANSLATION,
+                key,
+                translated,
+                video_id=video_id,
+                meta={"source_language": track.language_code}
+            )
+        return translated, track.is_generated
 
     except Exception as e:
         print(f"Transcript unavailable for {video_id}: {e}")
         return None
 
 
-def download_audio(youtube_url: str, output_file: str = "audio.mp3") -> str:
-    """Download best audio using yt-dlp (requires ffmpeg installed)"""
+def fetch_youtube_transcript(video_id: str, language: str = "en") -> Optional[List[Dict]]:
+    """
+    Fetch YouTube transcript using the latest youtube-transcript-api (v2+).
+    Returns list of {'text': ..., 'start': ..., 'duration': ...} or None if unavailable.
+    See fetch_youtube_track.
+    """
+    fetched = fetch_youtube_track(video_id, language)
+    return fetched[0] if fetched else None
+
+
+# Whisper's native input: 16 kHz mono float32 PCM
+WHISPER_SAMPLE_RATE = 16000
+
+
+def resolve_audio_stream(youtube_url: str) -> Tuple[str, Dict[str, str]]:
+    """Return the direct URL and HTTP headers of the best audio stream, without downloading it."""
     ydl_opts = {
         "format": "bestaudio/best",
-        "outtmpl": output_file.replace(".mp3", ""),
         "quiet": True,
-        "postprocessors": [{
-            "key": "FFmpegExtractAudio",
-            "preferredcodec": "mp3",
-            "preferredquality": "192",
-        }],
+        "skip_download": True,
     }
-    
     with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-        ydl.download([youtube_url])
-    
-    return output_file if os.path.exists(output_file) else output_file.replace(".mp3", ".mp3")
+        info = ydl.extract_info(youtube_url, download=False)
 
+    if "requested_formats" in info:
+        info = info["requested_formats"][0]
+    return info["url"], info.get("http_headers", {})
+
+
+def decode_audio(youtube_url: str) -> np.ndarray:
+    """
+    Stream a video's audio through a single ffmpeg pipe into a 16 kHz mono
+    float32 array ready for Whisper (requires ffmpeg installed).
+
+    ffmpeg reads the stream URL directly and writes raw PCM to stdout, so
+    there is one decode, no intermediate MP3 and no file name that
+    concurrent requests could collide on.
+    """
+    stream_url, headers = resolve_audio_stream(youtube_url)
+    header_blob = "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+
+    cmd = ["ffmpeg", "-nostdin", "-loglevel", "error"]
+    if header_blob:
+        cmd += ["-headers", header_blob]
+    cmd += [
+        "-i", stream_url,
+        "-f", "s16le",
+        "-ac", "1",
+        "-acodec", "pcm_s16le",
+        "-ar", str(WHISPER_SAMPLE_RATE),
+        "-",
+    ]
+
+    result = subprocess.run(cmd, capture_output=True, check=False)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed to decode audio: {result.stderr.decode(errors='ignore').strip()}")
+
+    return np.frombuffer(result.stdout, np.int16).astype(np.float32) / 32768.0
+
+
+# Audio transcribed between two checkpoints, in seconds
+WHISPER_WINDOW_SECONDS = float(os.getenv("WHISPER_WINDOW_SECONDS", "600"))
+
+# Segments ending this close to a window's end are re-transcribed with the
+# next window, so windows are joined at pauses rather than mid-word
+WHISPER_WINDOW_OVERLAP = 2.0
+
+_whisper_models: Dict[str, object] = {}
+
+
+def _load_whisper_model(model_size: str):
+    # Loaded once per process; the CPU stage reuses its worker processes
+    if model_size not in _whisper_models:
+        print(f"Loading Whisper model '{model_size}'...")
+        _whisper_models[model_size] = whisper.load_model(model_size)
+    return _whisper_models[model_size]
+
+
+def audio_fingerprint(audio: np.ndarray) -> str:
+    return hashlib.sha256(np.ascontiguousarray(audio).view(np.uint8)).hexdigest()[:32]
+
+
+def transcribe_with_whisper(audio: Union[str, np.ndarray], model_size: str = "small") -> List[Dict]:
+    """
+    Transcribe audio using OpenAI Whisper (slow, fallback only).
+
+    Accepts a file path or a 16 kHz mono float32 array from decode_audio.
+
+    Audio is transcribed in windows of WHISPER_WINDOW_SECONDS and the
+    segments are checkpointed in the artifact store after every window,
+    keyed by audio hash and model size. A retried or restarted job resumes
+    from the last completed offset, and a finished transcription is
+    returned straight from the store.
+    """
+    if isinstance(audio, str):
+        audio = whisper.load_audio(audio)
+
+    store = get_store()
+    key = f"{audio_fingerprint(audio)}:{model_size}"
+    checkpoint = store.get(WHISPER_CHECKPOINT, key) or {"offset": 0.0, "segments": [], "done": False}
+    if checkpoint["done"]:
+        return checkpoint["segments"]
+
+    model = _load_whisper_model(model_size)
+    total = len(audio) / WHISPER_SAMPLE_RATE
+    segments = checkpoint["segments"]
+    offset = checkpoint["offset"]
+    if offset:
+        print(f"Resuming Whisper transcription at {offset:.0f}s of {total:.0f}s")
+
+    while offset < total:
+        window_end = min(offset + WHISPER_WINDOW_SECONDS, total)
+        window = audio[int(offset * WHISPER_SAMPLE_RATE):int(window_end * WHISPER_SAMPLE_RATE)]
+
+        print(f"Transcribing {offset:.0f}s - {window_end:.0f}s...")
+        previous_text = " ".join(seg["text"] for seg in segments[-5:])
+        result = model.transcribe(window, initial_prompt=previous_text[-200:] or None)
+
+        last_window = window_end >= total
+        next_offset = window_end
+        for seg in result["segments"]:
+            start = offset + seg["start"]
+            end = offset + seg["end"]
+            if not last_window and end > window_end - WHISPER_WINDOW_OVERLAP:
+                next_offset = min(next_offset, start)
+                break
+            segments.append({
+                "text": seg["text"].strip(),
+                "start": start,
+                "duration": end - start
+            })
+        # Always make progress, even if the window held one long segment
+        offset = next_offset if next_offset > offset else window_end
+
+        store.put(
+            WHISPER_CHECKPOINT,
+            key,
+            {"offset": offset, "segments": segments, "done": offset >= total}
+        )
 
-def transcribe_with_whisper(audio_file: str, model_size: str = "small") -> List[Dict]:
-    """Transcribe audio using OpenAI Whisper (slow, fallback only)"""
-    print(f"Loading Whisper model '{model_size}'...")
-    model = whisper.load_model(model_size)
-    print("Transcribing...")
-    result = model.transcribe(audio_file)
-    
-    segments = []
-    for seg in result["segments"]:
-        segments.append({
-            "text": seg["text"].strip(),
-            "start": seg["start"],
-            "duration": seg["end"] - seg["start"]
-        })
     return segments
 
+
+def transcribe_video(video_id: str, model_size: str = "small") -> List[Dict]:
+    """
+    Transcribe a video with Whisper, reusing any finished transcription.
+
+    Runs in the CPU process pool; results are shared with every later
+    request for the video through the artifact store.
+    """
+    store = get_store()
+    key = f"{video_id}:{model_size}"
+    segments = store.get(WHISPER_TRANSCRIPT, key)
+    if segments is None:
+        segments = transcribe_video_audio(f"https://www.youtube.com/watch?v={video_id}", model_size)
+        store.put(WHISPER_TRANSCRIPT, key, segments, video_id=video_id)
+    return segments
+
+
+def transcribe_video_audio(youtube_url: str, model_size: str = "small") -> List[Dict]:
+    """Decode a video's audio in memory and transcribe it with Whisper."""
+    return transcribe_with_whisper(decode_audio(youtube_url), model_size)
+
 def extract_video_id(url: str) -> Optional[str]:
     """
     Extract video ID from various YouTube URL formats.
@@ -116,7 +346,6 @@ def extract_video_id(url: str) -> Optional[str]:
 if __name__ == "__main__":
     YOUTUBE_URL = "https://youtu.be/_hheZx7hxGQ?si=Qie5cyZ8HWKWeinm"
     OUTPUT_JSON = "transcript.json"
-    AUDIO_FILE = "video_audio.mp3"
 
     video_id = get_video_id(YOUTUBE_URL)
     if not video_id:
@@ -129,12 +358,8 @@ if __name__ == "__main__":
         print("Official transcript fetched successfully!")
     else:
         print("No official transcript → falling back to Whisper")
-        audio_path = download_audio(YOUTUBE_URL, AUDIO_FILE)
-        transcript_data = transcribe_with_whisper(audio_path)
+        transcript_data = transcribe_video_audio(YOUTUBE_URL)
         print(transcript_data)
-        if os.path.exists(audio_path):
-            os.remove(audio_path)
-            print("Cleaned up audio file")
 
     with open(OUTPUT_JSON, "w", encoding="utf-8") as f:
         json.dump(transcript_data, f, indent=4, ensure_ascii=False)
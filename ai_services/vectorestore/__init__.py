@@ -1,3 +1,12 @@
-from .retriever import retrieve_top_k
+from .retriever import retrieve_top_k, retrieve_top_k_batch
+from .corpus_index import CorpusIndex, get_corpus_index
+from .selection import select_coverage, select_chunks
 
-__all__ = ['retrieve_top_k']
\ No newline at end of file
+__all__ = [
+    'retrieve_top_k',
+    'retrieve_top_k_batch',
+    'CorpusIndex',
+    'get_corpus_index',
+    'select_coverage',
+    'select_chunks',
+]
\ No newline at end of file
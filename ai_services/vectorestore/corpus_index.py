@@ -0,0 +1,215 @@
+import heapq
+import math
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Set
+
+from store.artifact_store import get_store, CHUNKS
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have he her his i if in into is it its "
+    "me my of on or our she so that the their them then there these they this to was "
+    "we were what when where which who will with you your do does did not no can just "
+    "about also been being how than too very would could should um uh".split()
+)
+
+# Seconds between checks of the artifact store for chunk sets added or
+# evicted by other workers
+REFRESH_INTERVAL = 5.0
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+class CorpusIndex:
+    """
+    BM25 inverted index over the chunks of every ingested video.
+
+    Chunk sets are added and removed incrementally by their artifact
+    store key, so a new video only costs indexing its own chunks.
+
+    Args:
+        k1: BM25 term frequency saturation
+        b: BM25 length normalisation
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self._docs: Dict[int, Dict] = {}
+        self._sources: Dict[str, List[int]] = {}
+        # Sources fed incrementally (live streams) that have no chunk set
+        # in the artifact store yet; refresh() leaves them alone
+        self._transient: Set[str] = set()
+        self._next_id = 0
+        self._total_length = 0
+        self._last_refresh = 0.0
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    @property
+    def sources(self) -> List[str]:
+        return list(self._sources)
+
+    def add(self, source_key: str, video_id: str, chunks: List[Dict]) -> int:
+        """Index a video's chunk set, replacing any earlier copy of it."""
+        with self._lock:
+            self.remove(source_key)
+            self._sources[source_key] = self._index_docs(source_key, video_id, chunks)
+            return len(chunks)
+
+    def extend(self, source_key: str, video_id: str, chunks: List[Dict]) -> int:
+        """
+        Append chunks to a source in place, e.g. newly finalized chunks of
+        a live stream. Costs time proportional to the new chunks only.
+        """
+        with self._lock:
+            if source_key not in self._sources:
+                self._sources[source_key] = []
+                self._transient.add(source_key)
+            self._sources[source_key].extend(self._index_docs(source_key, video_id, chunks))
+            return len(chunks)
+
+    def _index_docs(self, source_key: str, video_id: str, chunks: List[Dict]) -> List[int]:
+        doc_ids = []
+        for chunk in chunks:
+            terms = Counter(tokenize(chunk.get("text", "")))
+            doc_id = self._next_id
+            self._next_id += 1
+            length = sum(terms.values())
+            self._docs[doc_id] = {
+                "video_id": video_id,
+                "start_time": chunk.get("start_time"),
+                "end_time": chunk.get("end_time"),
+                "text": chunk.get("text", ""),
+                "length": length,
+                "source": source_key,
+            }
+            for term, tf in terms.items():
+                self._postings[term][doc_id] = tf
+            self._total_length += length
+            doc_ids.append(doc_id)
+        return doc_ids
+
+    def remove(self, source_key: str) -> int:
+        """Drop a chunk set from the index."""
+        with self._lock:
+            doc_ids = self._sources.pop(source_key, [])
+            self._transient.discard(source_key)
+            for doc_id in doc_ids:
+                doc = self._docs.pop(doc_id)
+                self._total_length -= doc["length"]
+                for term in set(tokenize(doc["text"])):
+                    postings = self._postings.get(term)
+                    if postings is not None:
+                        postings.pop(doc_id, None)
+                        if not postings:
+                            del self._postings[term]
+            return len(doc_ids)
+
+    def remove_video(self, video_id: str) -> int:
+        with self._lock:
+            keys = [
+                key for key, ids in self._sources.items()
+                if ids and self._docs[ids[0]]["video_id"] == video_id
+            ]
+            return sum(self.remove(key) for key in keys)
+
+    def search(
+        self,
+        query: str,
+        limit: int = 10,
+        offset: int = 0,
+        video_id: Optional[str] = None
+    ) -> Dict:
+        """
+        Rank chunks across the corpus against a query.
+
+        Returns a dict with 'total_hits' and the requested page of 'results'.
+        """
+        terms = tokenize(query)
+        with self._lock:
+            n_docs = len(self._docs)
+            if not terms or not n_docs:
+                return {"total_hits": 0, "results": []}
+
+            avg_length = self._total_length / n_docs or 1.0
+            scores: Dict[int, float] = defaultdict(float)
+            for term in set(terms):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    doc = self._docs[doc_id]
+                    if video_id is not None and doc["video_id"] != video_id:
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * doc["length"] / avg_length)
+                    scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+            top = heapq.nlargest(offset + limit, scores.items(), key=lambda item: item[1])
+            results = []
+            for doc_id, score in top[offset:]:
+                doc = self._docs[doc_id]
+                results.append({
+                    "video_id": doc["video_id"],
+                    "start_time": doc["start_time"],
+                    "end_time": doc["end_time"],
+                    "score": round(score, 4),
+                    "text": doc["text"],
+                })
+            return {"total_hits": len(scores), "results": results}
+
+    def refresh(self, force: bool = False) -> None:
+        """
+        Bring the index in line with the chunk sets in the artifact store.
+
+        Only keys are compared, so unchanged chunk sets are never reloaded.
+        Store reads run outside the index lock, so searches keep going
+        while new chunk sets are loaded.
+        """
+        if not force and time.time() - self._last_refresh < REFRESH_INTERVAL:
+            return
+        self._last_refresh = time.time()
+        store = get_store()
+        stored = {entry["key"]: entry["video_id"] for entry in store.list_keys(CHUNKS)}
+        with self._lock:
+            for key in set(self._sources) - set(stored) - self._transient:
+                self.remove(key)
+            missing = set(stored) - set(self._sources)
+        for key in missing:
+            chunks = store.get(CHUNKS, key)
+            if not chunks:
+                continue
+            with self._lock:
+                # Another thread may have indexed it meanwhile
+                if key not in self._sources:
+                    self.add(key, stored[key], chunks)
+
+
+_index: Optional[CorpusIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_corpus_index() -> CorpusIndex:
+    """Return this worker's corpus index, synced with the artifact store."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                # Load the full corpus before publishing the index, so the
+                # first load never holds up searches on a live index
+                index = CorpusIndex()
+                index.refresh(force=True)
+                _index = index
+                return _index
+    _index.refresh()
+    return _index
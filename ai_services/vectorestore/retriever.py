@@ -8,4 +8,26 @@ def retrieve_top_k(chunks: list, query: str, k: int = 5):
         scored.append((score, chunk))
 
     scored.sort(reverse=True, key=lambda x: x[0])
-    return [chunk for _, chunk in scored[:k]]
\ No newline at end of file
+    return [chunk for _, chunk in scored[:k]]
+
+def retrieve_top_k_batch(chunks: list, queries: list, k: int = 5):
+    """
+    Retrieve the top-k chunks for many queries in one pass.
+
+    Chunk word sets are built once and shared by every query; the ranking
+    for each query matches retrieve_top_k. Returns one list of chunk
+    indices per query, so callers can refer to shared chunks by position.
+    """
+    chunk_words = [set(chunk["text"].lower().split()) for chunk in chunks]
+    results = []
+
+    for query in queries:
+        query_words = set(query.lower().split())
+        scored = [
+            (len(query_words & words), index)
+            for index, words in enumerate(chunk_words)
+        ]
+        scored.sort(reverse=True, key=lambda x: x[0])
+        results.append([index for _, index in scored[:k]])
+
+    return results
@@ -0,0 +1,99 @@
+from typing import Dict, List
+
+import numpy as np
+
+from vectorestore.corpus_index import tokenize
+from vectorestore.retriever import retrieve_top_k
+
+
+def term_matrix(texts: List[str]) -> np.ndarray:
+    """L2-normalised TF-IDF matrix with one row per text."""
+    tokenized = [tokenize(text) for text in texts]
+    vocabulary: Dict[str, int] = {}
+    for tokens in tokenized:
+        for token in tokens:
+            vocabulary.setdefault(token, len(vocabulary))
+
+    matrix = np.zeros((len(texts), max(len(vocabulary), 1)), dtype=np.float32)
+    for row, tokens in enumerate(tokenized):
+        if tokens:
+            ids, counts = np.unique([vocabulary[t] for t in tokens], return_counts=True)
+            matrix[row, ids] = counts
+
+    df = np.count_nonzero(matrix, axis=0)
+    idf = np.log((1 + len(texts)) / (1 + df)) + 1.0
+    matrix *= idf
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+
+def select_coverage(chunks: List[Dict], k: int = 8, diversity: float = 0.5) -> List[Dict]:
+    """
+    Pick k chunks that together cover the whole video.
+
+    Chunks are scored MMR-style: similarity to the centroid of the video
+    (how representative a chunk is) minus its similarity to chunks already
+    picked. The timeline is split into k equal time strata and each
+    stratum yields a chunk before any stratum yields a second one, so no
+    section of the video is skipped.
+
+    Args:
+        chunks: Transcript chunks with 'text', 'start_time' and 'end_time'
+        k: Number of chunks to return
+        diversity: Weight of the redundancy penalty, 0 (pure relevance) to 1
+
+    Returns:
+        The selected chunks in timeline order
+    """
+    if len(chunks) <= k:
+        return list(chunks)
+
+    vectors = term_matrix([c.get("text", "") for c in chunks])
+    centroid = vectors.mean(axis=0)
+    norm = np.linalg.norm(centroid)
+    relevance = vectors @ (centroid / norm) if norm else np.zeros(len(chunks), dtype=np.float32)
+
+    midpoints = np.array(
+        [(c.get("start_time", 0) + c.get("end_time", 0)) / 2 for c in chunks],
+        dtype=np.float64
+    )
+    span = midpoints.max() - midpoints.min()
+    if span > 0:
+        strata = np.minimum(((midpoints - midpoints.min()) / span * k).astype(int), k - 1)
+    else:
+        # No usable timestamps, stratify by position instead
+        strata = np.arange(len(chunks)) * k // len(chunks)
+
+    selected: List[int] = []
+    available = np.ones(len(chunks), dtype=bool)
+    covered = np.zeros(k, dtype=bool)
+    redundancy = np.zeros(len(chunks), dtype=np.float32)
+
+    for _ in range(k):
+        candidates = available & ~covered[strata]
+        if not candidates.any():
+            candidates = available
+        scores = (1 - diversity) * relevance - diversity * redundancy
+        best = int(np.argmax(np.where(candidates, scores, -np.inf)))
+
+        selected.append(best)
+        available[best] = False
+        covered[strata[best]] = True
+        # One mat-vec per pick instead of a full n x n similarity matrix
+        redundancy = np.maximum(redundancy, vectors @ vectors[best])
+
+    return [chunks[i] for i in sorted(selected)]
+
+
+def select_chunks(chunks: List[Dict], query: str, k: int, selection: str = "coverage") -> List[Dict]:
+    """
+    Select context chunks for a whole-video task.
+
+    'coverage' spreads k chunks across the timeline (select_coverage);
+    'query' ranks chunks by word overlap with the query (retrieve_top_k).
+    """
+    if selection == "coverage":
+        return select_coverage(chunks, k)
+    if selection == "query":
+        return retrieve_top_k(chunks=chunks, query=query, k=k)
+    raise ValueError(f"Unknown chunk selection mode '{selection}'")